@@ -1,20 +1,79 @@
+import asyncio
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI, HTTPException
+from fastapi.responses import PlainTextResponse, Response, StreamingResponse
 from pydantic import BaseModel
 from fastapi.middleware.cors import CORSMiddleware
-from dotenv import load_dotenv
-import os
-from groq import Groq
 
-load_dotenv()
-GROQ_API_KEY = os.environ.get("GROQ_API_KEY")
+import config
 
-if not GROQ_API_KEY:
+if not config.GROQ_API_KEY:
     raise RuntimeError("GROQ_API_KEY tidak ditemukan di .env")
 
-# Initialize Groq client
-groq_client = Groq(api_key=GROQ_API_KEY)
+import cache
+import compaction
+import gate
+import legal_index
+import metrics
+import streaming
+import upstream
+from scheduler import Priority
+
+# Jawaban dari model cadangan tidak disimpan agar tidak menggantikan jawaban model utama
+farm_cache = cache.ResponseCache(
+    ttl=config.FARM_CACHE_TTL,
+    stale_ttl=config.FARM_CACHE_STALE_TTL,
+    max_entries=config.FARM_CACHE_MAX_ENTRIES,
+    path=config.FARM_CACHE_PATH,
+    cacheable=lambda result: result["model"] == config.AI_MODEL,
+)
+
+law_summary_cache = cache.ResponseCache(
+    ttl=config.LAW_SUMMARY_CACHE_TTL,
+    stale_ttl=0,
+    max_entries=config.LAW_SUMMARY_CACHE_MAX_ENTRIES,
+    path=config.LAW_SUMMARY_CACHE_PATH,
+)
+
+
+async def summarize_thread(previous: str | None, messages: list[dict]) -> str:
+    chat_completion = await upstream.create_completion(
+        compaction.summary_request(previous, messages),
+        max_tokens=config.LAW_SUMMARY_MAX_TOKENS,
+        model=config.LAW_SUMMARY_MODEL,
+    )
+    return chat_completion.choices[0].message.content
+
+
+law_index = legal_index.load_index(config.LAW_INDEX_PATH)
+if law_index is None:
+    print("⚠️ Indeks peraturan tidak ditemukan, Tanya Hukum berjalan tanpa kutipan pasal:", config.LAW_INDEX_PATH)
 
-app = FastAPI()
+law_compactor = compaction.Compactor(
+    budget=config.LAW_PROMPT_TOKEN_BUDGET,
+    recent_tokens=config.LAW_RECENT_TOKENS,
+    summary_max_tokens=config.LAW_SUMMARY_MAX_TOKENS,
+    summary_cache=law_summary_cache,
+    summarize=summarize_thread,
+)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    await upstream.close()
+    farm_cache.close()
+    law_summary_cache.close()
+    if law_index is not None:
+        law_index.close()
+
+
+app = FastAPI(lifespan=lifespan)
+
+metrics.register_collector({"farm": farm_cache, "law_summary": law_summary_cache}, upstream.scheduler)
+profiler = metrics.SamplingProfiler(config.PROFILE_EVERY) if config.PROFILE_EVERY > 0 else None
+app.add_middleware(metrics.MetricsMiddleware, profiler=profiler)
 
 app.add_middleware(
     CORSMiddleware,
@@ -32,110 +91,322 @@ class Message(BaseModel):
 
 class Prompt(BaseModel):
     messages: list[Message]
+    thread_id: str | None = None  # opsional, memisahkan cache ringkasan per thread
 
 class FarmPrompt(BaseModel):
     plant: str
     location: str
     question: str = ""  # opsional
 
+class FarmBatchItem(FarmPrompt):
+    id: str | None = None  # correlation id dari pemanggil, dikembalikan apa adanya
+
+class FarmBatch(BaseModel):
+    items: list[FarmBatchItem]
+
+### ==== Gate topik ====
+
+gate_classifier = (
+    gate.TfidfClassifier.train(gate.load_samples(config.GATE_SEED_PATH)) if config.GATE_CLASSIFIER else None
+)
+law_gate = gate.create_law_gate(gate_classifier, config.GATE_LAW_THRESHOLD)
+farm_gate = gate.create_farm_gate(gate_classifier, config.GATE_FARM_THRESHOLD)
+
 ### ==== Tanya Hukum ====
 
-KEYWORDS_HUKUM = [
-    "pasal", "uu", "undang", "hukum", "perdata", "pidana",
-    "pengadilan", "perjanjian", "kontrak", "pengacara", "advokat", "perkara"
-]
+LAW_SYSTEM_PROMPT = (
+    "Kamu adalah asisten hukum berbasis AI yang bertugas membantu masyarakat awam di Indonesia. "
+    "Tugasmu adalah memberikan penjelasan hukum yang netral, mudah dipahami, dan sesuai dengan peraturan perundang-undangan di Indonesia. "
+    "Dasar hukum dapat mencakup UUD 1945, KUHP, KUHPer, UU Ketenagakerjaan, UU Perlindungan Konsumen, dan lainnya. "
+    "Jangan menjawab topik di luar hukum, dan arahkan pengguna untuk konsultasi dengan advokat bila perlu. "
+    "Jawaban harus sopan, edukatif, dan tidak bersifat mengikat."
+)
+
+LAW_OFF_TOPIC_ANSWER = (
+    "Maaf, saya hanya dapat membantu menjawab pertanyaan seputar **hukum di Indonesia**. "
+    "Silakan ajukan pertanyaan yang relevan dengan topik hukum seperti pasal, undang-undang, atau pengadilan."
+)
 
 def is_legal_question(prompt: Prompt) -> bool:
-    combined_text = " ".join(msg.content.lower() for msg in prompt.messages)
-    return any(keyword in combined_text for keyword in KEYWORDS_HUKUM)
+    return law_gate.allows_conversation([{"role": msg.role, "content": msg.content} for msg in prompt.messages])
+
+# Ringkasan lama tidak dipakai lagi bila prompt atau model peringkas berubah
+LAW_SUMMARY_VERSION = cache.make_key(compaction.SUMMARY_PROMPT, config.LAW_SUMMARY_MODEL)[:12]
+
+def latest_user_message(prompt: Prompt) -> str:
+    return next((msg.content for msg in reversed(prompt.messages) if msg.role == "user"), "")
+
+def referenced_articles(question: str) -> tuple[list[dict], bool]:
+    """Pasal yang dirujuk pertanyaan, dan apakah pertanyaan cukup dijawab dengan teksnya saja.
+
+    Hanya permintaan teks murni ("apa isi pasal 362 KUHP?") yang dijawab langsung
+    dari indeks, dan hanya bila semua pasal yang dirujuk ada di indeks.
+    """
+    if law_index is None:
+        return [], False
+    references = law_index.references(question)
+    articles = [a for a in (law_index.lookup(*ref) for ref in references) if a is not None]
+    direct = bool(articles) and len(articles) == len(references) and law_index.is_lookup(question)
+    return articles, direct
+
+def article_answer(passages: list[dict]) -> str:
+    quotes = "\n\n".join(f"**Pasal {p['article']} {p['name']}**\n\n{p['text']}" for p in passages)
+    return (
+        f"{quotes}\n\n"
+        "_Kutipan di atas diambil dari teks peraturan. Untuk penerapannya pada kasus Anda, "
+        "konsultasikan dengan advokat atau lembaga bantuan hukum._"
+    )
+
+def retrieve_passages(question: str, pinned: list[dict]) -> list[dict]:
+    """Pasal yang dirujuk langsung di urutan teratas, disusul hasil BM25 yang belum ada."""
+    if law_index is None or not question:
+        return pinned
+    seen = {(p["law"], p["article"]) for p in pinned}
+    found = law_index.search(question, k=config.LAW_RETRIEVAL_TOP_K, min_score=config.LAW_RETRIEVAL_MIN_SCORE)
+    passages = pinned + [p for p in found if (p["law"], p["article"]) not in seen]
+    return passages[:max(config.LAW_RETRIEVAL_TOP_K, len(pinned))]
+
+def grounded_system_prompt(passages: list[dict]) -> str:
+    if not passages:
+        return LAW_SYSTEM_PROMPT
+    quotes = "\n\n".join(
+        f"[Pasal {p['article']} {p['name']}]\n{p['text'][:config.LAW_PASSAGE_MAX_CHARS]}" for p in passages
+    )
+    return (
+        f"{LAW_SYSTEM_PROMPT}\n\n"
+        "Berikut kutipan peraturan yang mungkin relevan. Gunakan bila sesuai dan sebutkan pasalnya; "
+        f"abaikan bila tidak berkaitan.\n\n{quotes}"
+    )
+
+def sources(passages: list[dict]) -> list[dict]:
+    return [{"law": p["law"], "article": p["article"]} for p in passages]
+
+async def build_law_messages(prompt: Prompt, passages: list[dict] = ()) -> list[dict]:
+    messages = [{"role": msg.role, "content": msg.content} for msg in prompt.messages]
+    seed = f"{LAW_SUMMARY_VERSION}:{prompt.thread_id or ''}"
+    return await law_compactor.compact(grounded_system_prompt(passages), messages, seed=seed)
 
 @app.post("/ask-law")
-def ask_law_ai(prompt: Prompt):
+async def ask_law_ai(prompt: Prompt, stream: bool = False, format: streaming.StreamFormat = "sse"):
     if not is_legal_question(prompt):
-        return {
-            "answer": (
-                "Maaf, saya hanya dapat membantu menjawab pertanyaan seputar **hukum di Indonesia**. "
-                "Silakan ajukan pertanyaan yang relevan dengan topik hukum seperti pasal, undang-undang, atau pengadilan."
-            )
-        }
+        metrics.GATE_REJECTIONS.labels("/ask-law").inc()
+        if stream:
+            return streaming.static_response(LAW_OFF_TOPIC_ANSWER, format)
+        return {"answer": LAW_OFF_TOPIC_ANSWER, "model": None}
+
+    question = latest_user_message(prompt)
+    articles, direct = referenced_articles(question)
+    if direct:
+        metrics.LAW_INDEX_ANSWERS.inc()
+        if stream:
+            return streaming.static_response(article_answer(articles), format, extra={"sources": sources(articles)})
+        return {"answer": article_answer(articles), "model": None, "sources": sources(articles)}
 
     try:
-        # Prepare messages for Groq
-        messages = [
-            {
-                "role": "system",
-                "content": (
-                    "Kamu adalah asisten hukum berbasis AI yang bertugas membantu masyarakat awam di Indonesia. "
-                    "Tugasmu adalah memberikan penjelasan hukum yang netral, mudah dipahami, dan sesuai dengan peraturan perundang-undangan di Indonesia. "
-                    "Dasar hukum dapat mencakup UUD 1945, KUHP, KUHPer, UU Ketenagakerjaan, UU Perlindungan Konsumen, dan lainnya. "
-                    "Jangan menjawab topik di luar hukum, dan arahkan pengguna untuk konsultasi dengan advokat bila perlu. "
-                    "Jawaban harus sopan, edukatif, dan tidak bersifat mengikat."
-                )
-            }
-        ]
-        
-        # Add user messages
-        for msg in prompt.messages:
-            messages.append({
-                "role": msg.role,
-                "content": msg.content
-            })
-
-        chat_completion = groq_client.chat.completions.create(
-            messages=messages,
-            model="llama-3.3-70b-versatile",
-            temperature=0.7,
-            max_tokens=1024,
-            top_p=1
-        )
+        passages = retrieve_passages(question, articles)
+        messages = await build_law_messages(prompt, passages)
 
-        return {"answer": chat_completion.choices[0].message.content}
+        if stream:
+            completion = await upstream.open_stream(messages)
+            return streaming.stream_response(
+                completion, format, label="Tanya Hukum", extra={"sources": sources(passages)},
+            )
 
+        chat_completion = await upstream.create_completion(messages)
+
+        return {
+            "answer": chat_completion.choices[0].message.content,
+            "model": chat_completion.model,
+            "sources": sources(passages),
+        }
+
+    except HTTPException:
+        raise
     except Exception as e:
         print("❌ Error Tanya Hukum:", str(e))
+        metrics.record_error(e)
         raise HTTPException(status_code=500, detail="Gagal memproses permintaan hukum.")
 
 ### ==== FarmSmart ====
 
+FARM_SYSTEM_PROMPT = (
+    "Kamu adalah asisten pertanian cerdas. Tugasmu adalah memberikan panduan budidaya tanaman "
+    "yang sesuai dengan kondisi umum di Indonesia, termasuk perawatan, hama, panen, dan efisiensi hasil. "
+    "Berikan informasi langkah demi langkah yang mudah dipahami oleh petani awam. "
+    "Jangan bahas hukum, agama, atau topik non-pertanian."
+)
+
+# Ikut berubah bila system prompt diubah, sehingga jawaban lama tidak terpakai lagi
+FARM_PROMPT_VERSION = cache.make_key(FARM_SYSTEM_PROMPT)[:12]
+
+def farm_cache_key(prompt: FarmPrompt) -> str:
+    return cache.make_key(
+        cache.normalize(prompt.plant),
+        cache.normalize(prompt.location),
+        cache.normalize(prompt.question),
+        config.AI_MODEL,
+        FARM_PROMPT_VERSION,
+    )
+
+FARM_OFF_TOPIC_ANSWER = (
+    "Maaf, saya hanya dapat membantu menjawab pertanyaan seputar **pertanian**. "
+    "Silakan ajukan pertanyaan tentang perawatan tanaman, hama, pemupukan, atau panen."
+)
+
+def is_farm_question(prompt: FarmPrompt) -> bool:
+    # Tanpa pertanyaan tambahan, prompt selalu berupa panduan budidaya tanaman.
+    # Pertanyaan lanjutan dinilai bersama tanamannya ("padi" + "berapa harga di sini?")
+    return not prompt.question.strip() or farm_gate.allows(prompt.question, context=prompt.plant)
+
+def build_farm_messages(prompt: FarmPrompt) -> list[dict]:
+    full_prompt = (
+        f"Saya menanam {prompt.plant} di daerah {prompt.location}. "
+        f"{prompt.question.strip() if prompt.question else ''} "
+        "Beri saya panduan lengkap: langkah perawatan, potensi risiko, dan tips panen."
+    )
+    return [
+        {"role": "system", "content": FARM_SYSTEM_PROMPT},
+        {"role": "user", "content": full_prompt},
+    ]
+
+def farm_compute(messages: list[dict], priority: Priority):
+    async def compute() -> dict:
+        chat_completion = await upstream.create_completion(messages, priority=priority)
+        return {"answer": chat_completion.choices[0].message.content, "model": chat_completion.model}
+    return compute
+
+async def farm_answer(
+    prompt: FarmPrompt, priority: Priority = Priority.INTERACTIVE, endpoint: str = "/ask-farm",
+) -> dict:
+    """Jawaban FarmSmart (lewat gate dan cache) berupa ``{"answer", "model"}``.
+
+    ``endpoint`` menjadi label metrik penolakan gate.
+    """
+    if not is_farm_question(prompt):
+        metrics.GATE_REJECTIONS.labels(endpoint).inc()
+        return {"answer": FARM_OFF_TOPIC_ANSWER, "model": None}
+    messages = build_farm_messages(prompt)
+    return await farm_cache.get_or_compute(
+        farm_cache_key(prompt),
+        farm_compute(messages, priority),
+        refresh=farm_compute(messages, Priority.BACKGROUND),
+    )
+
 @app.post("/ask-farm")
-def ask_farm_ai(prompt: FarmPrompt):
+async def ask_farm_ai(prompt: FarmPrompt, stream: bool = False, format: streaming.StreamFormat = "sse"):
     try:
-        full_prompt = (
-            f"Saya menanam {prompt.plant} di daerah {prompt.location}. "
-            f"{prompt.question.strip() if prompt.question else ''} "
-            "Beri saya panduan lengkap: langkah perawatan, potensi risiko, dan tips panen."
-        )
+        if stream:
+            # Tanpa stream, gate dijalankan di farm_answer (dipakai juga oleh batch)
+            if not is_farm_question(prompt):
+                metrics.GATE_REJECTIONS.labels("/ask-farm").inc()
+                return streaming.static_response(FARM_OFF_TOPIC_ANSWER, format)
+            messages = build_farm_messages(prompt)
+            key = farm_cache_key(prompt)
+            cached = await farm_cache.lookup(key, refresh=farm_compute(messages, Priority.BACKGROUND))
+            if cached is None:
+                # Request identik yang sedang berjalan (stream atau bukan) cukup ditunggu hasilnya
+                cached = await farm_cache.join(key)
+            if cached is not None:
+                return streaming.static_response(cached["answer"], format, model=cached["model"])
 
-        messages = [
-            {
-                "role": "system",
-                "content": (
-                    "Kamu adalah asisten pertanian cerdas. Tugasmu adalah memberikan panduan budidaya tanaman "
-                    "yang sesuai dengan kondisi umum di Indonesia, termasuk perawatan, hama, panen, dan efisiensi hasil. "
-                    "Berikan informasi langkah demi langkah yang mudah dipahami oleh petani awam. "
-                    "Jangan bahas hukum, agama, atau topik non-pertanian."
-                )
-            },
-            {
-                "role": "user",
-                "content": full_prompt
-            }
-        ]
-
-        chat_completion = groq_client.chat.completions.create(
-            messages=messages,
-            model="llama-3.3-70b-versatile",
-            temperature=0.7,
-            max_tokens=1024,
-            top_p=1
-        )
+            claim = farm_cache.claim(key)
+            try:
+                completion = await upstream.open_stream(messages)
+            except BaseException as e:
+                claim.fail(e)
+                raise
+            return streaming.stream_response(
+                completion, format, label="FarmSmart", on_complete=claim.resolve, on_close=claim.fail,
+            )
 
-        return {"answer": chat_completion.choices[0].message.content}
+        return await farm_answer(prompt)
 
+    except HTTPException:
+        raise
     except Exception as e:
         print("❌ Error FarmSmart:", str(e))
+        metrics.record_error(e)
         raise HTTPException(status_code=500, detail="Gagal memproses permintaan pertanian.")
 
+@app.post("/ask-farm/batch")
+async def ask_farm_batch(batch: FarmBatch):
+    """Analisis banyak tanaman sekaligus; hasil dikirim sebagai NDJSON begitu selesai.
+
+    Item dengan (plant, location, question) yang sama hanya diproses sekali.
+    Kegagalan satu item dilaporkan di field ``error`` item itu saja.
+    """
+    if len(batch.items) > config.FARM_BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Maksimal {config.FARM_BATCH_MAX_ITEMS} item per batch.",
+        )
+
+    groups: dict[str, list[tuple[int, FarmBatchItem]]] = {}
+    for index, item in enumerate(batch.items):
+        groups.setdefault(farm_cache_key(item), []).append((index, item))
+
+    async def results():
+        slots = asyncio.Semaphore(config.FARM_BATCH_PARALLELISM)
+
+        async def run(members: list[tuple[int, FarmBatchItem]]):
+            async with slots:
+                try:
+                    return members, await farm_answer(members[0][1], Priority.BATCH, "/ask-farm/batch"), None
+                except HTTPException as e:
+                    return members, None, e.detail
+                except Exception as e:
+                    print("❌ Error FarmSmart batch:", str(e))
+                    metrics.record_error(e)
+                    return members, None, "Gagal memproses permintaan pertanian."
+
+        tasks = [asyncio.create_task(run(members)) for members in groups.values()]
+        failed = 0
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                members, result, error = await next_done
+                for index, item in members:
+                    failed += error is not None
+                    yield streaming.encode_event(
+                        "result",
+                        {
+                            "index": index,
+                            "id": item.id,
+                            "answer": result["answer"] if result else None,
+                            "model": result["model"] if result else None,
+                            "error": error,
+                        },
+                        "ndjson",
+                    )
+            yield streaming.encode_event(
+                "done",
+                {"count": len(batch.items), "unique": len(groups), "failed": failed},
+                "ndjson",
+            )
+        finally:
+            # Klien putus: hentikan item yang belum selesai
+            for task in tasks:
+                task.cancel()
+
+    return StreamingResponse(results(), media_type="application/x-ndjson", headers={"X-Accel-Buffering": "no"})
+
+@app.get("/cache/stats")
+async def cache_stats():
+    return {"farm": farm_cache.snapshot(), "law_summary": law_summary_cache.snapshot()}
+
+@app.get("/scheduler/stats")
+async def scheduler_stats():
+    return upstream.scheduler.snapshot()
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    body, content_type = metrics.render()
+    return Response(content=body, media_type=content_type)
+
+if profiler is not None:
+    @app.get("/debug/profile", response_class=PlainTextResponse)
+    async def debug_profile(limit: int = 50, reset: bool = False):
+        return profiler.dump(limit=limit, reset=reset)
+
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
+    uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -0,0 +1,113 @@
+"""Akurasi dan latensi gate topik.
+
+Jalankan dari folder ai-service:
+
+    python -m bench.bench_gate [--classifier] [--repeat 2000]
+"""
+import argparse
+import os
+import time
+
+import gate
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data")
+
+# Gate lama (substring) sebagai pembanding
+LEGACY_KEYWORDS = [
+    "pasal", "uu", "undang", "hukum", "perdata", "pidana",
+    "pengadilan", "perjanjian", "kontrak", "pengacara", "advokat", "perkara"
+]
+
+
+def legacy_allows(text: str) -> bool:
+    lowered = text.lower()
+    return any(keyword in lowered for keyword in LEGACY_KEYWORDS)
+
+
+class LegacyGate:
+    def allows_conversation(self, messages: list[dict]) -> bool:
+        return legacy_allows(" ".join(m["content"] for m in messages))
+
+
+def evaluate(name: str, allows, samples, positive: str):
+    tp = fp = fn = tn = 0
+    errors = []
+    for text, label in samples:
+        predicted = allows(text)
+        actual = label == positive
+        if predicted and actual:
+            tp += 1
+        elif predicted:
+            fp += 1
+            errors.append(("FP", text))
+        elif actual:
+            fn += 1
+            errors.append(("FN", text))
+        else:
+            tn += 1
+    accuracy = (tp + tn) / len(samples)
+    precision = tp / (tp + fp) if tp + fp else 0.0
+    recall = tp / (tp + fn) if tp + fn else 0.0
+    print(f"{name:<28} akurasi={accuracy:.3f} presisi={precision:.3f} recall={recall:.3f}")
+    for kind, text in errors:
+        print(f"    {kind}: {text}")
+
+
+def time_per_call(allows, texts, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for text in texts:
+            allows(text)
+    return (time.perf_counter() - start) / (repeat * len(texts)) * 1e6
+
+
+def time_conversation(law_gate, turns: int, repeat: int) -> float:
+    """Biaya per giliran untuk thread yang terus bertambah (putusan prefix di-cache)."""
+    messages = []
+    total = 0.0
+    for t in range(turns):
+        messages.append({"role": "user", "content": f"Lalu bagaimana kelanjutannya untuk giliran {t}?"})
+        start = time.perf_counter()
+        for _ in range(repeat):
+            law_gate.allows_conversation(messages)
+        total += time.perf_counter() - start
+        messages.append({"role": "assistant", "content": "Menurut pasal terkait, " + "penjelasan " * 80})
+    return total / (turns * repeat) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--classifier", action="store_true", help="latih dan uji classifier TF-IDF juga")
+    parser.add_argument("--repeat", type=int, default=2000)
+    args = parser.parse_args()
+
+    samples = gate.load_samples(os.path.join(DATA_DIR, "gate_eval.jsonl"))
+    texts = [text for text, _ in samples]
+
+    gates = [("hukum (leksikon)", gate.create_law_gate(), "hukum"),
+             ("pertanian (leksikon)", gate.create_farm_gate(), "pertanian")]
+    if args.classifier:
+        start = time.perf_counter()
+        classifier = gate.TfidfClassifier.train(gate.load_samples(os.path.join(DATA_DIR, "gate_seed.jsonl")))
+        print(f"pelatihan classifier: {(time.perf_counter() - start) * 1000:.1f} ms")
+        gates += [("hukum (leksikon+tfidf)", gate.create_law_gate(classifier), "hukum"),
+                  ("pertanian (leksikon+tfidf)", gate.create_farm_gate(classifier), "pertanian")]
+
+    print(f"\n== Akurasi ({len(samples)} contoh) ==")
+    evaluate("hukum (substring lama)", legacy_allows, samples, "hukum")
+    for name, topic_gate, positive in gates:
+        evaluate(name, topic_gate.allows, samples, positive)
+
+    print("\n== Latensi per pesan ==")
+    print(f"{'hukum (substring lama)':<28} {time_per_call(legacy_allows, texts, args.repeat):8.2f} µs")
+    for name, topic_gate, _ in gates:
+        print(f"{name:<28} {time_per_call(topic_gate.allows, texts, args.repeat):8.2f} µs")
+
+    repeat = max(1, args.repeat // 100)
+    print("\n== Latensi per giliran, thread 40 giliran ==")
+    print(f"{'hukum (substring lama)':<28} {time_conversation(LegacyGate(), 40, repeat):8.2f} µs")
+    print(f"{'hukum (leksikon, cache)':<28} {time_conversation(gate.create_law_gate(), 40, repeat):8.2f} µs")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""Waktu bangun, waktu muat, dan latensi query indeks peraturan.
+
+Jalankan dari folder ai-service:
+
+    python -m bench.bench_retrieval [--source data/laws] [--articles 3000]
+
+Tanpa ``--source`` dipakai korpus sintetis (kosakata hukum acak), cukup untuk
+mengukur biaya indeks walau tidak mencerminkan kualitas jawaban.
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+import ingest_laws
+import legal_index
+
+WORDS = (
+    "barang siapa mengambil barang milik orang lain dengan maksud dimiliki secara melawan hukum "
+    "diancam pidana penjara paling lama tahun denda perjanjian para pihak wajib memenuhi prestasi "
+    "ganti rugi wanprestasi hak milik tanah warisan ahli waris hibah wasiat pengadilan negeri "
+    "gugatan putusan banding kasasi saksi bukti surat akta notaris perkawinan perceraian nafkah "
+    "anak kekerasan penipuan penggelapan pencurian penganiayaan pembunuhan kelalaian"
+).split()
+
+QUERIES = [
+    "apa hukuman untuk pencurian barang milik orang lain",
+    "bagaimana cara menuntut ganti rugi karena wanprestasi perjanjian",
+    "pembagian warisan untuk ahli waris dan anak",
+    "syarat gugatan perceraian di pengadilan negeri",
+    "ancaman pidana penggelapan dan penipuan",
+]
+
+
+def write_synthetic(folder: str, laws: int, articles: int, rng: random.Random):
+    for n in range(laws):
+        lines = [f"Nama: Undang-Undang Contoh {n}", f"Alias: uu contoh {n}, uuc{n}", ""]
+        for article in range(1, articles // laws + 1):
+            length = rng.randint(30, 120)
+            lines += [f"Pasal {article}", " ".join(rng.choice(WORDS) for _ in range(length)), ""]
+        with open(os.path.join(folder, f"uuc{n}.txt"), "w", encoding="utf-8") as f:
+            f.write("\n".join(lines))
+
+
+def percentiles(samples: list[float]) -> tuple[float, float]:
+    samples = sorted(samples)
+    return samples[len(samples) // 2], samples[int(len(samples) * 0.95)]
+
+
+def time_queries(func, queries, repeat: int) -> list[float]:
+    timings = []
+    for _ in range(repeat):
+        for query in queries:
+            start = time.perf_counter()
+            func(query)
+            timings.append((time.perf_counter() - start) * 1e6)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--source", help="folder teks peraturan (format ingest_laws.py)")
+    parser.add_argument("--laws", type=int, default=5)
+    parser.add_argument("--articles", type=int, default=3000, help="jumlah pasal korpus sintetis")
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        source = args.source
+        if source is None:
+            source = os.path.join(tmp, "laws")
+            os.makedirs(source)
+            write_synthetic(source, args.laws, args.articles, random.Random(7))
+        target = os.path.join(tmp, "index")
+
+        start = time.perf_counter()
+        meta = ingest_laws.build_index(source, target)
+        print(f"bangun indeks: {(time.perf_counter() - start) * 1000:8.1f} ms  ({meta['documents']} pasal)")
+
+        start = time.perf_counter()
+        index = legal_index.load_index(target)
+        print(f"muat indeks:   {(time.perf_counter() - start) * 1000:8.1f} ms")
+
+        law, article = next(iter(index.articles))
+        lookups = [f"apa isi pasal {article} {law}"]
+
+        print("\n== Latensi per query ==")
+        for name, func, queries in [
+            ("bm25 top-3", lambda q: index.search(q, k=3), QUERIES),
+            ("lookup pasal", lambda q: index.lookup(*index.find_reference(q)), lookups),
+        ]:
+            p50, p95 = percentiles(time_queries(func, queries, args.repeat))
+            print(f"{name:<14} p50 {p50:8.1f} µs   p95 {p95:8.1f} µs")
+        index.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""Bandingkan dua hasil bench.loadgen per tingkat konkurensi.
+
+    python -m bench.compare bench/results/baseline.json bench/results/new.json --max-regression 10
+
+Keluar dengan kode 1 bila ada metrik yang memburuk lebih dari ambang (persen),
+atau bila rasio error naik lebih dari ``--max-error-increase`` (poin absolut).
+"""
+import argparse
+import json
+import sys
+
+# (bagian, metrik, True bila nilai lebih besar lebih baik)
+METRICS = [
+    (None, "rps", True),
+    ("latency_ms", "p50", False),
+    ("latency_ms", "p95", False),
+    ("latency_ms", "p99", False),
+    ("ttfb_ms", "p50", False),
+    ("ttfb_ms", "p95", False),
+]
+
+
+def value(level: dict, section: str | None, name: str):
+    return level.get(name) if section is None else level.get(section, {}).get(name)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--max-regression", type=float, default=10.0, help="ambang regresi dalam persen")
+    parser.add_argument("--max-error-increase", type=float, default=0.01,
+                        help="kenaikan rasio error maksimum (mis. 0.01 = 1 poin persen)")
+    args = parser.parse_args(argv)
+
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    with open(args.candidate, encoding="utf-8") as f:
+        candidate = json.load(f)
+
+    base_levels = {level["concurrency"]: level for level in baseline["levels"]}
+    regressions = 0
+    for level in candidate["levels"]:
+        base = base_levels.get(level["concurrency"])
+        if base is None:
+            continue
+        print(f"== konkurensi {level['concurrency']} ==")
+        # Rasio error dibandingkan secara absolut; baseline sehat bernilai 0
+        old_errors, new_errors = base.get("error_ratio"), level.get("error_ratio")
+        if new_errors is not None:
+            flag = ""
+            if new_errors - (old_errors or 0.0) > args.max_error_increase:
+                flag = "  << REGRESI"
+                regressions += 1
+            print(f"  {'error_ratio':<16} {old_errors if old_errors is not None else '-':>10} -> {new_errors:>10}{flag}")
+        for section, name, higher_is_better in METRICS:
+            old, new = value(base, section, name), value(level, section, name)
+            if not old or new is None:
+                continue
+            change = (new - old) / old * 100
+            worse = -change if higher_is_better else change
+            flag = ""
+            if worse > args.max_regression:
+                flag = "  << REGRESI"
+                regressions += 1
+            label = name if section is None else f"{section}.{name}"
+            print(f"  {label:<16} {old:>10} -> {new:>10}  ({change:+.1f}%){flag}")
+
+    old_rss = [v for v in (baseline.get("peak_rss_mb") or {}).values() if v is not None]
+    new_rss = [v for v in (candidate.get("peak_rss_mb") or {}).values() if v is not None]
+    if old_rss and new_rss:
+        print(f"peak RSS maks per worker: {max(old_rss)} MB -> {max(new_rss)} MB")
+
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+"""Pengganti lokal untuk API chat-completions Groq/OpenAI.
+
+Dipakai untuk benchmark dan uji beban tanpa memakai kuota API sungguhan:
+
+    python -m bench.fake_groq --port 9000 --latency 0.3 --tokens-per-second 300 --rate-limit-rate 0.05
+
+lalu jalankan AI service dengan ``GROQ_BASE_URL=http://127.0.0.1:9000``.
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+import uuid
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+WORDS = (
+    "tanaman perlu disiram secara teratur dan diberi pupuk organik agar tumbuh subur "
+    "menurut pasal yang berlaku hak dan kewajiban para pihak harus dipenuhi dengan itikad baik "
+    "pastikan lahan memiliki drainase yang baik serta pantau hama setiap minggu"
+).split()
+
+
+class FakeSettings:
+    def __init__(self, args: argparse.Namespace):
+        self.latency = args.latency
+        self.tokens_per_second = args.tokens_per_second
+        self.completion_tokens = args.completion_tokens
+        self.rate_limit_rate = args.rate_limit_rate
+        self.error_rate = args.error_rate
+        self.retry_after = args.retry_after
+        self.tpm = args.tpm
+        self.rpm = args.rpm
+        self.fail_models = {m for m in args.fail_models.split(",") if m}
+        self.fail_first = args.fail_first
+
+
+def create_app(settings: FakeSettings) -> FastAPI:
+    app = FastAPI()
+    stats = {"requests": 0, "rate_limited": 0, "errors": 0, "streams": 0, "completion_tokens": 0}
+
+    def rate_limit_headers() -> dict:
+        return {
+            "x-ratelimit-limit-requests": str(settings.rpm),
+            "x-ratelimit-limit-tokens": str(settings.tpm),
+            "x-ratelimit-remaining-requests": str(settings.rpm - 1),
+            "x-ratelimit-remaining-tokens": str(settings.tpm - settings.completion_tokens),
+            "x-ratelimit-reset-requests": "2m59.56s",
+            "x-ratelimit-reset-tokens": "7.66s",
+        }
+
+    @app.post("/openai/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        stats["requests"] += 1
+        model = body.get("model", "fake-model")
+        max_tokens = min(body.get("max_tokens") or settings.completion_tokens, settings.completion_tokens)
+        prompt_tokens = sum(len(str(m.get("content", "")).split()) for m in body.get("messages", []))
+
+        # Kegagalan hanya disuntikkan ke model di --fail-models (bila diisi)
+        failing = not settings.fail_models or model in settings.fail_models
+        forced = failing and settings.fail_first > 0
+        if forced:
+            settings.fail_first -= 1
+        roll = random.random() if failing else 1.0
+        if forced or roll < settings.rate_limit_rate:
+            stats["rate_limited"] += 1
+            headers = {**rate_limit_headers(), "retry-after": str(settings.retry_after),
+                       "x-ratelimit-remaining-tokens": "0",
+                       "x-ratelimit-reset-tokens": f"{settings.retry_after}s"}
+            return JSONResponse(
+                {"error": {"message": "Rate limit reached", "type": "tokens", "code": "rate_limit_exceeded"}},
+                status_code=429, headers=headers,
+            )
+        if roll < settings.rate_limit_rate + settings.error_rate:
+            stats["errors"] += 1
+            return JSONResponse({"error": {"message": "Internal error", "type": "internal_server_error"}},
+                                status_code=500)
+
+        await asyncio.sleep(settings.latency)
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+        usage = {"prompt_tokens": prompt_tokens, "completion_tokens": max_tokens,
+                 "total_tokens": prompt_tokens + max_tokens}
+        stats["completion_tokens"] += max_tokens
+
+        if body.get("stream"):
+            stats["streams"] += 1
+            return StreamingResponse(
+                stream_chunks(completion_id, model, max_tokens, usage, settings.tokens_per_second),
+                media_type="text/event-stream", headers=rate_limit_headers(),
+            )
+
+        # Tanpa streaming, seluruh token "dihasilkan" dulu sebelum respons dikirim
+        await asyncio.sleep(max_tokens / settings.tokens_per_second)
+        return JSONResponse({
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": fake_text(max_tokens)},
+                "finish_reason": "stop",
+                "logprobs": None,
+            }],
+            "usage": usage,
+        }, headers=rate_limit_headers())
+
+    @app.get("/stats")
+    async def fake_stats():
+        return stats
+
+    return app
+
+
+def fake_text(tokens: int) -> str:
+    return " ".join(WORDS[i % len(WORDS)] for i in range(tokens))
+
+
+async def stream_chunks(completion_id: str, model: str, tokens: int, usage: dict, tokens_per_second: float):
+    created = int(time.time())
+
+    def chunk(delta: dict, finish_reason=None, **extra) -> str:
+        payload = {
+            "id": completion_id,
+            "object": "chat.completion.chunk",
+            "created": created,
+            "model": model,
+            "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason, "logprobs": None}],
+            **extra,
+        }
+        return f"data: {json.dumps(payload)}\n\n"
+
+    yield chunk({"role": "assistant", "content": ""})
+    # Kirim per ~20 ms agar jumlah event tetap wajar pada token rate tinggi
+    per_event = max(1, int(tokens_per_second * 0.02))
+    for start in range(0, tokens, per_event):
+        words = [WORDS[i % len(WORDS)] for i in range(start, min(tokens, start + per_event))]
+        await asyncio.sleep(len(words) / tokens_per_second)
+        yield chunk({"content": " ".join(words) + " "})
+    yield chunk({}, finish_reason="stop", x_groq={"id": completion_id, "usage": usage})
+    yield "data: [DONE]\n\n"
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--latency", type=float, default=0.3, help="detik sebelum token pertama")
+    parser.add_argument("--tokens-per-second", type=float, default=300.0)
+    parser.add_argument("--completion-tokens", type=int, default=256, help="token per jawaban (dibatasi max_tokens)")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="proporsi request yang dibalas 429")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="proporsi request yang dibalas 500")
+    parser.add_argument("--retry-after", type=float, default=1.0)
+    parser.add_argument("--fail-models", default="", help="batasi 429/500 ke model ini (dipisah koma)")
+    parser.add_argument("--fail-first", type=int, default=0, help="N request pertama selalu dibalas 429")
+    parser.add_argument("--rpm", type=int, default=30000)
+    parser.add_argument("--tpm", type=int, default=10_000_000)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    uvicorn.run(create_app(FakeSettings(args)), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
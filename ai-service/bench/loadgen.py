@@ -0,0 +1,338 @@
+"""Generator beban untuk /ask-law dan /ask-farm.
+
+Secara default menjalankan upstream palsu (bench.fake_groq) dan AI service
+sendiri, lalu menembakkan payload realistis pada beberapa tingkat konkurensi:
+
+    python -m bench.loadgen --concurrency 10,50,200 --requests 1000 --workers 2 \\
+        --out bench/results/baseline.json
+
+Hasil (p50/p95/p99, RPS, time-to-first-byte, rasio error, peak RSS per worker)
+ditulis sebagai JSON; bandingkan dua hasil dengan ``python -m bench.compare``.
+Keluar dengan kode 1 bila rasio respons non-200 di suatu tingkat melewati
+``--max-error-ratio``; latensi hanya dihitung dari respons 200 sehingga tanpa
+pemeriksaan ini layanan yang rusak total tetap terlihat "cepat".
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+from collections import Counter
+
+import httpx
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+### ==== Payload ====
+
+LAW_OPENERS = [
+    "Saya di-PHK tanpa pesangon setelah bekerja lima tahun, apa hak saya menurut UU Ketenagakerjaan?",
+    "Tetangga membangun pagar di atas tanah saya, bagaimana proses gugatan ke pengadilan?",
+    "Apa isi pasal 362 KUHP tentang pencurian?",
+    "Bagaimana cara mengajukan gugatan cerai dan hak asuh anak?",
+    "Saya ditipu penjual online, apakah bisa dilaporkan sebagai tindak pidana penipuan?",
+    "Apakah perjanjian sewa rumah secara lisan sah menurut hukum perdata?",
+    "Bagaimana pembagian warisan jika orang tua tidak meninggalkan wasiat?",
+]
+LAW_FOLLOW_UPS = [
+    "Lalu dokumen apa saja yang perlu saya siapkan?",
+    "Berapa lama biasanya proses di pengadilan?",
+    "Apakah saya perlu pengacara untuk perkara ini?",
+    "Bagaimana jika pihak lawan tidak hadir?",
+    "Pasal mana yang bisa saya jadikan dasar?",
+    "Berapa perkiraan biayanya?",
+]
+ASSISTANT_REPLY = (
+    "Berdasarkan peraturan perundang-undangan yang berlaku, Anda memiliki beberapa pilihan. "
+    "Pertama, kumpulkan bukti tertulis dan saksi. Kedua, upayakan penyelesaian secara musyawarah. "
+    "Ketiga, bila tidak berhasil, ajukan gugatan atau laporan ke instansi yang berwenang. "
+) * 3
+
+CROPS = ["padi", "jagung", "cabai", "tomat", "bawang merah", "kedelai", "singkong", "kopi", "kakao", "sawit"]
+LOCATIONS = ["Kabupaten Bogor", "Kabupaten Garut", "Kabupaten Malang", "Kabupaten Jember", "Kabupaten Sleman",
+             "Kabupaten Lampung Tengah", "Kabupaten Gowa", "Kabupaten Deli Serdang"]
+FARM_QUESTIONS = ["", "", "", "Kapan waktu tanam terbaik?", "Bagaimana mengatasi hama?", "Pupuk apa yang cocok?"]
+
+
+def zipf_choice(rng: random.Random, items: list, s: float = 1.1):
+    # Sebagian kecil kombinasi mendominasi, seperti pola pemakaian nyata
+    weights = [1 / (rank + 1) ** s for rank in range(len(items))]
+    return rng.choices(items, weights=weights)[0]
+
+
+def law_payload(rng: random.Random) -> dict:
+    turns = rng.choice([1, 1, 2, 3, 4, 6, 8])
+    messages = [{"role": "user", "content": rng.choice(LAW_OPENERS)}]
+    for _ in range(turns - 1):
+        messages.append({"role": "assistant", "content": ASSISTANT_REPLY})
+        messages.append({"role": "user", "content": rng.choice(LAW_FOLLOW_UPS)})
+    return {"messages": messages}
+
+
+def farm_payload(rng: random.Random) -> dict:
+    return {
+        "plant": zipf_choice(rng, CROPS),
+        "location": zipf_choice(rng, LOCATIONS),
+        "question": rng.choice(FARM_QUESTIONS),
+    }
+
+
+### ==== Proses ====
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_ready(url: str, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            httpx.get(url, timeout=1.0)
+            return
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    raise RuntimeError(f"{url} tidak siap dalam {timeout} detik")
+
+
+def process_tree(pid: int) -> list[int]:
+    pids = [pid]
+    try:
+        for task in os.listdir(f"/proc/{pid}/task"):
+            with open(f"/proc/{pid}/task/{task}/children") as f:
+                for child in f.read().split():
+                    pids.extend(process_tree(int(child)))
+    except OSError:
+        pass
+    return pids
+
+
+def peak_rss_mb(pid: int) -> float | None:
+    """VmHWM (peak resident set) dari /proc; hanya tersedia di Linux."""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        return None
+    return None
+
+
+class Stack:
+    """Upstream palsu + AI service sebagai subprocess."""
+
+    def __init__(self, args: argparse.Namespace):
+        self.fake_port = free_port()
+        self.service_port = free_port()
+        fake_args = [
+            "--port", str(self.fake_port),
+            "--latency", str(args.latency),
+            "--tokens-per-second", str(args.tokens_per_second),
+            "--completion-tokens", str(args.completion_tokens),
+            "--rate-limit-rate", str(args.rate_limit_rate),
+            "--error-rate", str(args.error_rate),
+        ]
+        self.fake = subprocess.Popen([sys.executable, "-m", "bench.fake_groq", *fake_args], cwd=SERVICE_DIR)
+        env = {
+            **os.environ,
+            "GROQ_API_KEY": "bench",
+            "GROQ_BASE_URL": f"http://127.0.0.1:{self.fake_port}",
+        }
+        self.service = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "app:app", "--port", str(self.service_port),
+             "--workers", str(args.workers), "--log-level", "warning", "--no-access-log"],
+            cwd=SERVICE_DIR, env=env,
+        )
+        wait_ready(f"http://127.0.0.1:{self.fake_port}/stats")
+        wait_ready(f"http://127.0.0.1:{self.service_port}/metrics")
+
+    @property
+    def target(self) -> str:
+        return f"http://127.0.0.1:{self.service_port}"
+
+    def worker_rss(self) -> dict[str, float | None]:
+        pids = process_tree(self.service.pid)
+        # Dengan --workers > 1, proses induk hanya supervisor
+        workers = pids[1:] or pids
+        return {str(pid): peak_rss_mb(pid) for pid in workers}
+
+    def upstream_stats(self) -> dict:
+        return httpx.get(f"http://127.0.0.1:{self.fake_port}/stats").json()
+
+    def close(self):
+        for process in (self.service, self.fake):
+            process.terminate()
+        for process in (self.service, self.fake):
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+
+### ==== Pengukuran ====
+
+def percentiles(values: list[float]) -> dict:
+    if not values:
+        return {}
+    values = sorted(values)
+
+    def rank(p: float) -> float:
+        return round(values[min(len(values) - 1, int(p / 100 * len(values)))] * 1000, 2)
+
+    return {
+        "p50": rank(50), "p95": rank(95), "p99": rank(99),
+        "mean": round(sum(values) / len(values) * 1000, 2), "max": round(values[-1] * 1000, 2),
+    }
+
+
+async def one_request(client: httpx.AsyncClient, endpoint: str, payload: dict, stream: bool) -> dict:
+    params = {"stream": "true", "format": "ndjson"} if stream else None
+    start = time.perf_counter()
+    first_byte = None
+    status = 0
+    try:
+        async with client.stream("POST", endpoint, json=payload, params=params) as response:
+            status = response.status_code
+            async for _ in response.aiter_raw():
+                if first_byte is None:
+                    first_byte = time.perf_counter()
+    except httpx.HTTPError as e:
+        status = type(e).__name__
+    end = time.perf_counter()
+    return {
+        "endpoint": endpoint,
+        "status": status,
+        "latency": end - start,
+        "ttfb": (first_byte or end) - start,
+    }
+
+
+async def run_level(target: str, concurrency: int, total: int, law_ratio: float, stream: bool, seed: int) -> dict:
+    rng = random.Random(seed)
+    jobs = [
+        ("/ask-law", law_payload(rng)) if rng.random() < law_ratio else ("/ask-farm", farm_payload(rng))
+        for _ in range(total)
+    ]
+    results: list[dict] = []
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=target, limits=limits, timeout=300.0) as client:
+        queue = iter(jobs)
+
+        async def worker():
+            for endpoint, payload in queue:
+                results.append(await one_request(client, endpoint, payload, stream))
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        duration = time.perf_counter() - start
+
+    ok = [r for r in results if r["status"] == 200]
+    summary = {
+        "concurrency": concurrency,
+        "requests": total,
+        "duration_s": round(duration, 3),
+        "rps": round(len(ok) / duration, 2),
+        "error_ratio": round(1 - len(ok) / len(results), 4) if results else 1.0,
+        "status": dict(Counter(str(r["status"]) for r in results)),
+        "latency_ms": percentiles([r["latency"] for r in ok]),
+        "ttfb_ms": percentiles([r["ttfb"] for r in ok]),
+        "endpoints": {},
+    }
+    for endpoint in ("/ask-law", "/ask-farm"):
+        subset = [r for r in ok if r["endpoint"] == endpoint]
+        summary["endpoints"][endpoint] = {
+            "requests": len(subset),
+            "latency_ms": percentiles([r["latency"] for r in subset]),
+            "ttfb_ms": percentiles([r["ttfb"] for r in subset]),
+        }
+    return summary
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], cwd=SERVICE_DIR, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_level(level: dict):
+    latency, ttfb = level["latency_ms"], level["ttfb_ms"]
+    print(
+        f"c={level['concurrency']:<4} rps={level['rps']:<8} "
+        f"p50={latency.get('p50')}ms p95={latency.get('p95')}ms p99={latency.get('p99')}ms "
+        f"ttfb_p50={ttfb.get('p50')}ms errors={level['error_ratio']:.1%} status={level['status']}"
+    )
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--target", help="URL AI service yang sudah berjalan (lewati subprocess)")
+    parser.add_argument("--workers", type=int, default=1, help="jumlah worker uvicorn")
+    parser.add_argument("--concurrency", default="10,50,200", help="daftar tingkat konkurensi, dipisah koma")
+    parser.add_argument("--requests", type=int, default=500, help="jumlah request per tingkat")
+    parser.add_argument("--law-ratio", type=float, default=0.5, help="proporsi request /ask-law")
+    parser.add_argument("--stream", action="store_true", help="pakai mode streaming (NDJSON)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--label", default="", help="nama bebas untuk hasil ini")
+    parser.add_argument("--out", help="path file JSON hasil")
+    parser.add_argument("--max-error-ratio", type=float, default=0.01,
+                        help="batas proporsi respons non-200 per tingkat sebelum run dianggap gagal")
+    fake = parser.add_argument_group("upstream palsu")
+    fake.add_argument("--latency", type=float, default=0.3)
+    fake.add_argument("--tokens-per-second", type=float, default=300.0)
+    fake.add_argument("--completion-tokens", type=int, default=256)
+    fake.add_argument("--rate-limit-rate", type=float, default=0.0)
+    fake.add_argument("--error-rate", type=float, default=0.0)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    stack = None if args.target else Stack(args)
+    target = args.target or stack.target
+    try:
+        levels = []
+        for i, concurrency in enumerate(int(c) for c in args.concurrency.split(",")):
+            level = asyncio.run(run_level(target, concurrency, args.requests, args.law_ratio, args.stream, args.seed + i))
+            print_level(level)
+            levels.append(level)
+
+        report = {
+            "label": args.label,
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "git_commit": git_commit(),
+            "args": vars(args),
+            "levels": levels,
+            "peak_rss_mb": stack.worker_rss() if stack else None,
+            "upstream": stack.upstream_stats() if stack else None,
+        }
+    finally:
+        if stack:
+            stack.close()
+
+    print(f"peak RSS per worker (MB): {report['peak_rss_mb']}")
+    if args.out:
+        os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"hasil ditulis ke {args.out}")
+
+    failed = [level for level in report["levels"] if level["error_ratio"] > args.max_error_ratio]
+    for level in failed:
+        print(
+            f"❌ Error rate c={level['concurrency']}: {level['error_ratio']:.1%} respons non-200 "
+            f"(batas {args.max_error_ratio:.1%}), status={level['status']}",
+            file=sys.stderr,
+        )
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,284 @@
+import asyncio
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+def normalize(text: str) -> str:
+    return " ".join(text.lower().split())
+
+
+def make_key(*parts: str) -> str:
+    return hashlib.sha256(json.dumps(parts, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+def prefix_hashes(seed: str, messages: list[dict]) -> list[str]:
+    """``hashes[i]`` mengidentifikasi ``messages[:i + 1]`` (berantai, O(n))."""
+    hashes = []
+    digest = hashlib.sha256(seed.encode("utf-8")).digest()
+    for message in messages:
+        digest = hashlib.sha256(
+            digest + message["role"].encode("utf-8") + b"\0" + message["content"].encode("utf-8")
+        ).digest()
+        hashes.append(digest.hex())
+    return hashes
+
+
+### ==== Backend penyimpanan ====
+
+class MemoryBackend:
+    """LRU di memori dengan jumlah entri terbatas."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._data: OrderedDict[str, tuple[object, float]] = OrderedDict()
+
+    def get(self, key: str) -> tuple[object, float] | None:
+        entry = self._data.get(key)
+        if entry is not None:
+            self._data.move_to_end(key)
+        return entry
+
+    def set(self, key: str, value, stored_at: float):
+        self._data[key] = (value, stored_at)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+
+    def delete(self, key: str):
+        self._data.pop(key, None)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class SqliteBackend:
+    """Penyimpanan di disk (SQLite, mode WAL) yang bertahan setelah restart
+    dan bisa dibaca bersama oleh beberapa worker uvicorn. Nilai disimpan sebagai JSON."""
+
+    _TRIM_EVERY = 64
+
+    def __init__(self, path: str, max_entries: int, max_age: float):
+        self.max_entries = max_entries
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=5.0)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value TEXT NOT NULL, stored_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS cache_stored_at ON cache (stored_at)")
+        self._conn.commit()
+
+    def get(self, key: str) -> tuple[object, float] | None:
+        with self._lock:
+            row = self._conn.execute("SELECT value, stored_at FROM cache WHERE key = ?", (key,)).fetchone()
+        return (json.loads(row[0]), row[1]) if row else None
+
+    def set(self, key: str, value, stored_at: float):
+        encoded = json.dumps(value, ensure_ascii=False)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, stored_at) VALUES (?, ?, ?)",
+                (key, encoded, stored_at),
+            )
+            self._writes += 1
+            if self._writes % self._TRIM_EVERY == 0:
+                self._trim(stored_at)
+            self._conn.commit()
+
+    def _trim(self, now: float):
+        # Buang entri kedaluwarsa, lalu entri tertua bila melebihi kapasitas
+        self._conn.execute("DELETE FROM cache WHERE stored_at < ?", (now - self.max_age,))
+        self._conn.execute(
+            "DELETE FROM cache WHERE key IN ("
+            " SELECT key FROM cache ORDER BY stored_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,),
+        )
+
+    def delete(self, key: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+            self._conn.commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+### ==== Cache respons ====
+
+class Abandoned(Exception):
+    """Hasil yang diklaim lewat ``ResponseCache.claim`` batal tanpa jawaban (mis. klien stream putus)."""
+
+
+class Claim:
+    """Hasil yang dihitung di luar cache (mis. stream ke klien) dan ditunggu request identik."""
+
+    def __init__(self, cache: "ResponseCache", key: str, future: asyncio.Future):
+        self._cache = cache
+        self._key = key
+        self._future = future
+
+    async def resolve(self, value):
+        await self._cache.store(self._key, value)
+        if not self._future.done():
+            self._future.set_result(value)
+
+    def fail(self, error: BaseException | None = None):
+        """Tanpa ``error`` (atau bila dibatalkan), penunggu menghitung sendiri. Tidak berefek setelah ``resolve``."""
+        if not self._future.done():
+            self._future.set_exception(error if isinstance(error, Exception) else Abandoned())
+
+
+class ResponseCache:
+    """Cache jawaban LLM dengan TTL, stale-while-revalidate, dan penggabungan
+    request identik yang sedang berjalan.
+
+    Entri berumur < ``ttl`` dianggap segar. Entri berumur < ``ttl + stale_ttl``
+    langsung dikembalikan sambil diperbarui di latar belakang. Selain itu,
+    ``compute`` dipanggil; request identik yang datang bersamaan menunggu
+    hasil panggilan yang sama sehingga hanya satu panggilan upstream keluar.
+
+    Nilai harus bisa di-serialize ke JSON. ``cacheable`` (opsional) menyaring
+    hasil yang tidak boleh disimpan.
+    """
+
+    def __init__(self, ttl: float, stale_ttl: float, max_entries: int, path: str | None = None, cacheable=None):
+        self.cacheable = cacheable
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self._memory = MemoryBackend(max_entries)
+        self._disk = SqliteBackend(path, max_entries, ttl + stale_ttl) if path else None
+        self._inflight: dict[str, asyncio.Future] = {}
+        self.stats = {"hits": 0, "stale_hits": 0, "misses": 0, "coalesced": 0, "refreshes": 0, "errors": 0}
+
+    async def get_or_compute(self, key: str, compute, refresh=None):
+        value = await self.lookup(key, refresh or compute)
+        if value is not None:
+            return value
+        return await self._join(key, compute)
+
+    async def lookup(self, key: str, refresh=None):
+        """Kembalikan entri segar atau basi (tanpa memanggil upstream secara sinkron).
+
+        Bila entri basi dan ``refresh`` diberikan, pembaruan dijadwalkan di latar belakang.
+        Miss dicatat di sini; pemanggil bertanggung jawab mengisi cache.
+        """
+        entry = await self._get(key)
+        if entry is not None:
+            value, stored_at = entry
+            age = time.time() - stored_at
+            if age < self.ttl:
+                self.stats["hits"] += 1
+                return value
+            if age < self.ttl + self.stale_ttl:
+                self.stats["stale_hits"] += 1
+                if refresh is not None and key not in self._inflight:
+                    self.stats["refreshes"] += 1
+                    self._start(key, refresh, background=True)
+                return value
+            self._memory.delete(key)
+        self.stats["misses"] += 1
+        return None
+
+    async def peek(self, key: str):
+        """Ambil entri yang belum kedaluwarsa tanpa mengubah statistik."""
+        entry = await self._get(key)
+        if entry is None or time.time() - entry[1] >= self.ttl + self.stale_ttl:
+            return None
+        return entry[0]
+
+    async def store(self, key: str, value):
+        if self.cacheable is not None and not self.cacheable(value):
+            return
+        stored_at = time.time()
+        self._memory.set(key, value, stored_at)
+        if self._disk is not None:
+            await asyncio.to_thread(self._disk.set, key, value, stored_at)
+
+    async def _get(self, key: str) -> tuple[object, float] | None:
+        entry = self._memory.get(key)
+        if entry is None and self._disk is not None:
+            entry = await asyncio.to_thread(self._disk.get, key)
+            if entry is not None:
+                self._memory.set(key, *entry)
+        return entry
+
+    async def join(self, key: str):
+        """Tunggu hasil yang sedang dihitung untuk ``key``; ``None`` bila tidak ada."""
+        while (task := self._inflight.get(key)) is not None:
+            self.stats["coalesced"] += 1
+            try:
+                return await asyncio.shield(task)
+            except Abandoned:
+                continue
+        return None
+
+    def claim(self, key: str) -> Claim:
+        """Tandai ``key`` sedang dihitung di luar cache agar request identik menunggu.
+
+        Pemanggil wajib mengakhiri claim dengan ``resolve`` atau ``fail``.
+        """
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        future.add_done_callback(lambda f: self._finish(key, f, False))
+        return Claim(self, key, future)
+
+    async def _join(self, key: str, compute):
+        while True:
+            task = self._inflight.get(key)
+            if task is None:
+                task = self._start(key, compute)
+            else:
+                self.stats["coalesced"] += 1
+            try:
+                # shield: klien yang putus tidak membatalkan panggilan yang ditunggu klien lain
+                return await asyncio.shield(task)
+            except Abandoned:
+                continue
+
+    def _start(self, key: str, compute, background: bool = False) -> asyncio.Task:
+        task = asyncio.create_task(self._compute_and_store(key, compute))
+        self._inflight[key] = task
+        task.add_done_callback(lambda t: self._finish(key, t, background))
+        return task
+
+    async def _compute_and_store(self, key: str, compute):
+        value = await compute()
+        await self.store(key, value)
+        return value
+
+    def _finish(self, key: str, task: asyncio.Future, background: bool):
+        if self._inflight.get(key) is task:
+            self._inflight.pop(key)
+        # exception() selalu dibaca agar tidak muncul "Task exception was never retrieved"
+        if not task.cancelled() and task.exception() is not None and not isinstance(task.exception(), Abandoned):
+            self.stats["errors"] += 1
+            # Kegagalan miss biasa diteruskan ke pemanggil yang mencatatnya sendiri
+            if background:
+                print("❌ Error cache refresh:", str(task.exception()))
+
+    def snapshot(self) -> dict:
+        lookups = self.stats["hits"] + self.stats["stale_hits"] + self.stats["misses"]
+        return {
+            **self.stats,
+            "hit_ratio": round((self.stats["hits"] + self.stats["stale_hits"]) / lookups, 4) if lookups else 0.0,
+            "entries": len(self._memory),
+            "max_entries": self._memory.max_entries,
+            "inflight": len(self._inflight),
+            "disk": self._disk is not None,
+        }
+
+    def close(self):
+        if self._disk is not None:
+            self._disk.close()
@@ -0,0 +1,115 @@
+import re
+
+from cache import prefix_hashes
+
+# Perkiraan lokal: satu token per ~4 karakter tiap kata, satu token per tanda baca
+_TOKEN_RE = re.compile(r"\w+|[^\w\s]")
+MESSAGE_OVERHEAD = 4  # token untuk role dan pemisah per pesan
+
+SUMMARY_PROMPT = (
+    "Kamu meringkas percakapan konsultasi hukum antara pengguna dan asisten. "
+    "Pertahankan fakta kasus, pertanyaan pengguna, pasal atau undang-undang yang disebut, "
+    "dan kesimpulan yang sudah diberikan. Tulis ringkas dalam bahasa Indonesia, tanpa pembuka atau penutup."
+)
+
+
+def estimate_tokens(text: str) -> int:
+    return sum((len(token) + 3) // 4 for token in _TOKEN_RE.findall(text))
+
+
+def message_tokens(message: dict) -> int:
+    return estimate_tokens(message["content"]) + MESSAGE_OVERHEAD
+
+
+class Compactor:
+    """Menjaga prompt percakapan tetap di bawah anggaran token.
+
+    Pesan terbaru dikirim utuh; pesan lama diganti satu ringkasan bergulir.
+    Ringkasan disimpan di ``summary_cache`` dengan kunci hash prefix yang
+    diringkas, sehingga giliran berikutnya memakai ulang ringkasan yang sama
+    selama masih muat, dan pembaruan hanya meringkas pesan yang baru tergeser
+    (ringkasan lama + pesan baru), bukan seluruh riwayat.
+    """
+
+    def __init__(self, budget: int, recent_tokens: int, summary_max_tokens: int, summary_cache, summarize):
+        self.budget = budget
+        self.recent_tokens = recent_tokens
+        self.summary_max_tokens = summary_max_tokens
+        self.summary_cache = summary_cache
+        self._summarize = summarize  # async (ringkasan_lama | None, pesan) -> str
+
+    async def compact(self, system_prompt: str, messages: list[dict], seed: str = "") -> list[dict]:
+        system = {"role": "system", "content": system_prompt}
+        available = self.budget - message_tokens(system)
+        costs = [message_tokens(m) for m in messages]
+        if sum(costs) <= available or len(messages) < 2:
+            return [system, *messages]
+
+        # suffix[j] = token untuk messages[j:]
+        suffix = [0] * (len(messages) + 1)
+        for j in range(len(messages) - 1, -1, -1):
+            suffix[j] = suffix[j + 1] + costs[j]
+
+        hashes = prefix_hashes(seed, messages)
+        limit = available - self.summary_max_tokens - MESSAGE_OVERHEAD
+        last = len(messages) - 1  # pesan terbaru selalu dikirim utuh
+        first_fit = next((j for j in range(1, last + 1) if suffix[j] <= limit), last)
+
+        # Pakai ulang ringkasan yang sudah ada bila sisa pesannya masih muat
+        for j in range(last, first_fit - 1, -1):
+            summary = await self.summary_cache.peek(hashes[j - 1])
+            if summary is not None:
+                return self._assemble(system, summary, messages[j:])
+
+        # Geser batas cukup jauh agar ringkasan baru bertahan beberapa giliran
+        cut = next((j for j in range(first_fit, last + 1) if suffix[j] <= self.recent_tokens), last)
+        try:
+            summary = await self._summary_for(messages, hashes, cut)
+        except Exception as e:
+            print("❌ Error ringkasan percakapan:", str(e))
+            return [system, *messages[first_fit:]]
+        return self._assemble(system, summary, messages[cut:])
+
+    async def _summary_for(self, messages: list[dict], hashes: list[str], cut: int) -> str:
+        # Mulai dari ringkasan terpanjang yang sudah ada sebelum batas
+        base, summary = 0, None
+        for i in range(cut - 1, 0, -1):
+            summary = await self.summary_cache.peek(hashes[i - 1])
+            if summary is not None:
+                base = i
+                break
+
+        # Lipat pesan yang tergeser per potongan agar input ringkasan tetap kecil;
+        # setiap batas potongan ikut tersimpan sebagai ringkasan antara
+        chunk_limit = self.budget - self.summary_max_tokens
+        start = base
+        while start < cut:
+            end, used = start, 0
+            while end < cut and (end == start or used + message_tokens(messages[end]) <= chunk_limit):
+                used += message_tokens(messages[end])
+                end += 1
+            summary = await self.summary_cache.get_or_compute(
+                hashes[end - 1],
+                lambda prev=summary, chunk=messages[start:end]: self._summarize(prev, chunk),
+            )
+            start = end
+        return summary
+
+    @staticmethod
+    def _assemble(system: dict, summary: str, recent: list[dict]) -> list[dict]:
+        return [
+            system,
+            {"role": "system", "content": f"Ringkasan percakapan sebelumnya:\n{summary}"},
+            *recent,
+        ]
+
+
+def summary_request(previous: str | None, messages: list[dict]) -> list[dict]:
+    transcript = "\n".join(
+        f"{'Pengguna' if m['role'] == 'user' else 'Asisten'}: {m['content']}" for m in messages
+    )
+    if previous:
+        content = f"Ringkasan sejauh ini:\n{previous}\n\nLanjutan percakapan:\n{transcript}\n\nPerbarui ringkasan."
+    else:
+        content = f"Percakapan:\n{transcript}\n\nBuat ringkasannya."
+    return [{"role": "system", "content": SUMMARY_PROMPT}, {"role": "user", "content": content}]
@@ -0,0 +1,116 @@
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+def _env_int(name: str, default: int) -> int:
+    value = os.environ.get(name)
+    return int(value) if value else default
+
+
+def _env_float(name: str, default: float) -> float:
+    value = os.environ.get(name)
+    return float(value) if value else default
+
+
+### ==== Groq ====
+
+GROQ_API_KEY = os.environ.get("GROQ_API_KEY")
+GROQ_BASE_URL = os.environ.get("GROQ_BASE_URL") or None  # None = endpoint resmi Groq
+AI_MODEL = os.environ.get("AI_MODEL", "llama-3.3-70b-versatile")
+
+### ==== Koneksi upstream ====
+
+# Pool koneksi keep-alive yang dipakai bersama oleh semua request
+UPSTREAM_MAX_CONNECTIONS = _env_int("AI_UPSTREAM_MAX_CONNECTIONS", 200)
+UPSTREAM_MAX_KEEPALIVE = _env_int("AI_UPSTREAM_MAX_KEEPALIVE", 50)
+UPSTREAM_KEEPALIVE_EXPIRY = _env_float("AI_UPSTREAM_KEEPALIVE_EXPIRY", 30.0)
+
+# Timeout per request (detik)
+UPSTREAM_CONNECT_TIMEOUT = _env_float("AI_UPSTREAM_CONNECT_TIMEOUT", 5.0)
+UPSTREAM_TIMEOUT = _env_float("AI_UPSTREAM_TIMEOUT", 60.0)
+
+### ==== Konkurensi dan antrean ====
+
+# Jumlah maksimum panggilan LLM yang berjalan bersamaan per proses worker
+MAX_CONCURRENT_REQUESTS = _env_int("AI_MAX_CONCURRENT_REQUESTS", 256)
+# Panjang antrean maksimum; request berikutnya langsung dibalas 503
+QUEUE_MAX = _env_int("AI_QUEUE_MAX", 512)
+# Lama maksimum menunggu slot sebelum dibalas 503 (chat interaktif vs batch/latar belakang)
+QUEUE_TIMEOUT = _env_float("AI_QUEUE_TIMEOUT", 10.0)
+BATCH_QUEUE_TIMEOUT = _env_float("AI_BATCH_QUEUE_TIMEOUT", 120.0)
+
+### ==== Rate limit, retry, dan model cadangan ====
+
+# Batas per menit di sisi klien (0 = ikuti header x-ratelimit-* dari upstream saja)
+AI_RPM = _env_int("AI_RPM", 0)
+AI_TPM = _env_int("AI_TPM", 0)
+
+# Model lebih kecil/cepat yang dipakai saat model utama tertekan ("" = nonaktif)
+AI_FALLBACK_MODEL = os.environ.get("AI_FALLBACK_MODEL", "llama-3.1-8b-instant")
+AI_FALLBACK_RPM = _env_int("AI_FALLBACK_RPM", 0)
+AI_FALLBACK_TPM = _env_int("AI_FALLBACK_TPM", 0)
+# Alihkan ke model cadangan bila model utama harus menunggu lebih lama dari ini (detik)
+FALLBACK_WAIT = _env_float("AI_FALLBACK_WAIT", 2.0)
+
+UPSTREAM_MAX_RETRIES = _env_int("AI_UPSTREAM_MAX_RETRIES", 2)
+RETRY_BASE_DELAY = _env_float("AI_RETRY_BASE_DELAY", 0.5)
+RETRY_MAX_DELAY = _env_float("AI_RETRY_MAX_DELAY", 8.0)
+
+# Circuit breaker: buka setelah N kegagalan beruntun, coba lagi model utama setelah cooldown
+BREAKER_FAILURES = _env_int("AI_BREAKER_FAILURES", 5)
+BREAKER_COOLDOWN = _env_float("AI_BREAKER_COOLDOWN", 30.0)
+
+### ==== Cache FarmSmart ====
+
+# Jawaban segar selama TTL, lalu masih disajikan (sambil diperbarui) selama STALE_TTL
+FARM_CACHE_TTL = _env_float("AI_FARM_CACHE_TTL", 6 * 3600)
+FARM_CACHE_STALE_TTL = _env_float("AI_FARM_CACHE_STALE_TTL", 24 * 3600)
+FARM_CACHE_MAX_ENTRIES = _env_int("AI_FARM_CACHE_MAX_ENTRIES", 2048)
+# Path file SQLite opsional; bisa dipakai bersama oleh beberapa worker
+FARM_CACHE_PATH = os.environ.get("AI_FARM_CACHE_PATH") or None
+
+### ==== Kompaksi percakapan Tanya Hukum ====
+
+# Anggaran token prompt (system prompt + ringkasan + pesan) per request
+LAW_PROMPT_TOKEN_BUDGET = _env_int("AI_LAW_PROMPT_TOKEN_BUDGET", 6000)
+# Saat kompaksi berjalan, pesan terbaru disimpan utuh sampai batas ini,
+# sehingga ringkasan yang sama bisa dipakai ulang untuk beberapa giliran berikutnya
+LAW_RECENT_TOKENS = _env_int("AI_LAW_RECENT_TOKENS", 3000)
+LAW_SUMMARY_MAX_TOKENS = _env_int("AI_LAW_SUMMARY_MAX_TOKENS", 512)
+LAW_SUMMARY_MODEL = os.environ.get("AI_LAW_SUMMARY_MODEL", "llama-3.1-8b-instant")
+LAW_SUMMARY_CACHE_TTL = _env_float("AI_LAW_SUMMARY_CACHE_TTL", 7 * 24 * 3600)
+LAW_SUMMARY_CACHE_MAX_ENTRIES = _env_int("AI_LAW_SUMMARY_CACHE_MAX_ENTRIES", 4096)
+LAW_SUMMARY_CACHE_PATH = os.environ.get("AI_LAW_SUMMARY_CACHE_PATH") or None
+
+### ==== Gate topik ====
+
+# Aktifkan classifier TF-IDF lokal sebagai pelengkap leksikon
+GATE_CLASSIFIER = os.environ.get("AI_GATE_CLASSIFIER", "0") == "1"
+GATE_SEED_PATH = os.environ.get(
+    "AI_GATE_SEED_PATH", os.path.join(os.path.dirname(__file__), "data", "gate_seed.jsonl")
+)
+GATE_LAW_THRESHOLD = _env_float("AI_GATE_LAW_THRESHOLD", 0.5)
+GATE_FARM_THRESHOLD = _env_float("AI_GATE_FARM_THRESHOLD", 0.3)
+
+### ==== Batch FarmSmart ====
+
+FARM_BATCH_MAX_ITEMS = _env_int("AI_FARM_BATCH_MAX_ITEMS", 500)
+# Jumlah item unik yang diproses bersamaan dalam satu batch
+FARM_BATCH_PARALLELISM = _env_int("AI_FARM_BATCH_PARALLELISM", 8)
+
+### ==== Observabilitas ====
+
+# Profil wall-clock untuk satu dari setiap N request, dibaca di GET /debug/profile (0 = nonaktif)
+PROFILE_EVERY = _env_int("AI_PROFILE_EVERY", 0)
+
+### ==== Indeks peraturan Tanya Hukum ====
+
+# Folder hasil ingest_laws.py; bila tidak ada, /ask-law berjalan tanpa kutipan
+LAW_INDEX_PATH = os.environ.get(
+    "AI_LAW_INDEX_PATH", os.path.join(os.path.dirname(__file__), "data", "law_index")
+)
+LAW_RETRIEVAL_TOP_K = _env_int("AI_LAW_RETRIEVAL_TOP_K", 3)
+LAW_RETRIEVAL_MIN_SCORE = _env_float("AI_LAW_RETRIEVAL_MIN_SCORE", 1.0)
+LAW_PASSAGE_MAX_CHARS = _env_int("AI_LAW_PASSAGE_MAX_CHARS", 1200)
@@ -0,0 +1,268 @@
+import json
+import math
+import random
+import re
+from collections import Counter, OrderedDict, defaultdict
+
+### ==== Leksikon ====
+
+# Entri dicocokkan per kata utuh (sehingga "uu" tidak cocok di dalam "vacuum"):
+# "kata" = kata persis, "awalan*" = kata yang diawali awalan itu, "dua kata" = frasa.
+LEGAL_TERMS = [
+    "pasal", "ayat", "uu", "uud", "kuhp", "kuhper", "kuhperdata", "kuhap", "kuhd", "undang*",
+    "perundang*", "hukum*", "dihukum", "menghukum", "berhukum", "pidana*", "dipidana", "perdata*",
+    "keperdataan", "pengadilan", "mahkamah", "hakim", "jaksa", "gugat*", "menggugat", "digugat",
+    "tergugat", "penggugat", "sidang*", "persidangan", "perjanjian", "kontrak", "wanprestasi",
+    "pengacara", "advokat", "notaris", "perkara", "tersangka", "terdakwa", "dakwaan", "saksi",
+    "banding", "kasasi", "putusan", "vonis", "somasi", "sengketa", "lapor", "melapor", "melaporkan",
+    "dilaporkan", "polisi", "penipuan", "ditipu", "pencurian", "penggelapan", "pencemaran nama baik",
+    "korupsi", "pungli", "pungutan liar", "suap", "kdrt", "cerai*", "bercerai", "perceraian",
+    "hak asuh", "nafkah", "waris*", "warisan", "pewaris", "akta", "sertifikat", "phk", "pesangon",
+    "ketenagakerjaan", "upah minimum", "konsumen", "hak cipta", "merek dagang", "paten",
+    "peraturan", "perda", "perpu", "perppu", "legal", "ilegal", "sanksi", "denda", "tilang",
+    "penjara", "dipenjara", "kurungan", "tindak pidana", "ganti rugi", "kuasa hukum", "menuntut",
+    "tuntutan", "dituntut", "praperadilan", "restitusi", "ite",
+]
+
+FARM_TERMS = [
+    "tanam*", "menanam", "ditanam", "bertanam", "penanaman", "padi", "gabah", "jagung", "cabai",
+    "cabe", "tomat", "bawang", "kedelai", "singkong", "ubi", "kentang", "sawit", "kopi", "kakao",
+    "karet", "tebu", "pisang", "mangga", "durian", "jeruk", "semangka", "melon", "stroberi",
+    "terong", "kangkung", "bayam", "sawi", "selada", "wortel", "kacang", "sayur*", "buah*",
+    "pupuk*", "memupuk", "dipupuk", "pemupukan", "kompos", "hama", "gulma", "wereng", "ulat",
+    "jamur", "berjamur", "pestisida", "fungisida", "insektisida", "herbisida", "panen*", "memanen",
+    "dipanen", "benih", "bibit", "semai*", "menyemai", "persemaian", "irigasi", "pengairan",
+    "sawah", "ladang", "kebun", "lahan", "tanah", "gembur", "musim hujan", "musim kemarau",
+    "musim tanam", "curah hujan", "kemarau", "budidaya", "petani", "pertanian", "hidroponik",
+    "organik", "siram*", "menyiram", "penyiraman", "daun", "akar", "batang", "bunga", "berbuah",
+    "polybag", "mulsa", "ph", "hektar", "urea", "npk", "produktivitas", "busuk", "layu",
+    "okulasi", "pangkas", "memangkas", "rotasi tanaman", "varietas",
+]
+
+# Istilah hukum yang juga lazim saat petani menjual, mengekspor, atau mengurus izin
+# hasil tanamannya ("sertifikat benih", "dijual secara legal", "kontrak dengan pabrik")
+_FARM_SHARED_LEGAL_TERMS = {
+    "sertifikat", "legal", "ilegal", "peraturan", "perda", "kontrak", "perjanjian", "konsumen",
+    "sanksi", "denda", "paten", "merek dagang", "upah minimum", "lapor", "melapor", "melaporkan",
+    "dilaporkan",
+}
+
+# Topik yang jelas milik domain lain (system prompt FarmSmart melarang hukum dan agama).
+# Setiap prompt FarmSmart sudah tentang tanaman di suatu lokasi, jadi pertanyaan
+# lanjutannya sering tanpa istilah pertanian ("di provinsi mana paling cocok?").
+# Karena itu hanya kata yang tidak lazim dipakai petani yang dimasukkan: bukan
+# lokasi, perdagangan, atau keuangan ("provinsi", "internet", "bank benih", "kredit usaha").
+FARM_BLOCKED_TERMS = [term for term in LEGAL_TERMS if term not in _FARM_SHARED_LEGAL_TERMS] + [
+    "agama", "sholat", "shalat", "doa", "ibadah", "politik", "partai", "pemilu", "presiden",
+    "pacar", "film", "game", "sepak bola", "sepakbola", "resep", "coding", "programming",
+    "pemrograman", "website", "komputer", "laptop", "crypto", "saham", "judi", "zodiak",
+    "penyanyi", "dangdut", "lagu", "musik", "artis", "selebriti", "sakit kepala", "dokter",
+]
+
+_TOKEN_RE = re.compile(r"\w+")
+
+
+class KeywordMatcher:
+    """Pencocokan banyak pola sekaligus lewat lookup set per token.
+
+    Biaya sebanding panjang pesan, bukan jumlah kata kunci.
+    """
+
+    def __init__(self, terms: list[str]):
+        self._words: set[str] = set()
+        self._prefixes: set[str] = set()
+        self._phrases: set[tuple[str, ...]] = set()
+        for term in terms:
+            term = term.lower()
+            if " " in term:
+                self._phrases.add(tuple(term.split()))
+            elif term.endswith("*"):
+                self._prefixes.add(term[:-1])
+            else:
+                self._words.add(term)
+        self._prefix_lengths = sorted({len(p) for p in self._prefixes})
+        self._phrase_lengths = sorted({len(p) for p in self._phrases})
+
+    def search(self, text: str) -> bool:
+        tokens = _TOKEN_RE.findall(text.lower())
+        words, prefixes, lengths = self._words, self._prefixes, self._prefix_lengths
+        for token in tokens:
+            if token in words:
+                return True
+            for n in lengths:
+                if n > len(token):
+                    break
+                if token[:n] in prefixes:
+                    return True
+        for n in self._phrase_lengths:
+            for i in range(len(tokens) - n + 1):
+                if tuple(tokens[i:i + n]) in self._phrases:
+                    return True
+        return False
+
+
+### ==== Klasifikasi lokal (opsional) ====
+
+def _features(text: str) -> list[str]:
+    words = _TOKEN_RE.findall(text.lower())
+    return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+
+class TfidfClassifier:
+    """TF-IDF (unigram + bigram) dengan regresi logistik one-vs-rest per label.
+
+    Cukup kecil untuk dilatih saat startup dari data seed yang dibundel.
+    """
+
+    def __init__(self, idf: dict[str, float], weights: dict[str, dict[str, float]], bias: dict[str, float]):
+        self.idf = idf
+        self.weights = weights
+        self.bias = bias
+
+    @classmethod
+    def train(cls, samples: list[tuple[str, str]], epochs: int = 40, lr: float = 0.5, l2: float = 1e-4):
+        docs = [_features(text) for text, _ in samples]
+        df = Counter()
+        for doc in docs:
+            df.update(set(doc))
+        idf = {f: math.log((1 + len(docs)) / (1 + count)) + 1 for f, count in df.items()}
+        vectors = [cls._vectorize(doc, idf) for doc in docs]
+
+        weights, bias = {}, {}
+        order = list(range(len(samples)))
+        rng = random.Random(0)
+        for label in sorted({label for _, label in samples}):
+            w, b = defaultdict(float), 0.0
+            for _ in range(epochs):
+                rng.shuffle(order)
+                for i in order:
+                    target = 1.0 if samples[i][1] == label else 0.0
+                    z = b + sum(w[f] * v for f, v in vectors[i].items())
+                    grad = _sigmoid(z) - target
+                    for f, v in vectors[i].items():
+                        w[f] -= lr * (grad * v + l2 * w[f])
+                    b -= lr * grad
+            weights[label], bias[label] = dict(w), b
+        return cls(idf, weights, bias)
+
+    @staticmethod
+    def _vectorize(features: list[str], idf: dict[str, float]) -> dict[str, float]:
+        counts = Counter(f for f in features if f in idf)
+        vector = {f: (1 + math.log(c)) * idf[f] for f, c in counts.items()}
+        norm = math.sqrt(sum(v * v for v in vector.values())) or 1.0
+        return {f: v / norm for f, v in vector.items()}
+
+    def prob(self, text: str, label: str) -> float:
+        vector = self._vectorize(_features(text), self.idf)
+        w = self.weights[label]
+        return _sigmoid(self.bias[label] + sum(w.get(f, 0.0) * v for f, v in vector.items()))
+
+
+def _sigmoid(z: float) -> float:
+    if z < -30:
+        return 0.0
+    return 1.0 / (1.0 + math.exp(-z))
+
+
+def load_samples(path: str) -> list[tuple[str, str]]:
+    """Baca data JSONL berisi ``{"text": ..., "label": ...}`` per baris."""
+    with open(path, encoding="utf-8") as f:
+        rows = [json.loads(line) for line in f if line.strip()]
+    return [(row["text"], row["label"]) for row in rows]
+
+
+### ==== Gate topik ====
+
+class TopicGate:
+    """Memutuskan apakah sebuah pesan masuk topik layanan.
+
+    Urutan: leksikon topik (lolos) -> leksikon terlarang (tolak) -> classifier
+    lokal bila ada -> ``default``. Untuk percakapan, hanya pesan pengguna
+    terbaru yang dinilai; putusan untuk prefix sebelumnya diambil dari cache.
+    """
+
+    def __init__(
+        self,
+        label: str,
+        matcher: KeywordMatcher,
+        blocked: KeywordMatcher | None = None,
+        classifier: TfidfClassifier | None = None,
+        threshold: float = 0.5,
+        default: bool = False,
+        cache_size: int = 4096,
+    ):
+        self.label = label
+        self.matcher = matcher
+        self.blocked = blocked
+        self.classifier = classifier
+        self.threshold = threshold
+        self.default = default
+        self.cache_size = cache_size
+        self._verdicts: OrderedDict[int, bool] = OrderedDict()
+
+    def allows(self, text: str, context: str = "") -> bool:
+        """``context`` (mis. nama tanaman) hanya ikut dinilai classifier, bukan leksikon."""
+        if self.matcher.search(text):
+            return True
+        if self.blocked is not None and self.blocked.search(text):
+            return False
+        if self.classifier is not None:
+            return self.classifier.prob(f"{context} {text}" if context else text, self.label) >= self.threshold
+        return self.default
+
+    def allows_conversation(self, messages: list[dict]) -> bool:
+        """Percakapan lolos bila salah satu pesan pengguna masuk topik."""
+        hashes = _prefix_keys(messages)
+
+        # Cari putusan prefix terpanjang yang sudah diketahui
+        start, verdict = 0, False
+        for i in range(len(messages) - 1, -1, -1):
+            cached = self._verdicts.get(hashes[i])
+            if cached is not None:
+                self._verdicts.move_to_end(hashes[i])
+                start, verdict = i + 1, cached
+                break
+
+        # Pesan setelah prefix itu dinilai dari yang terbaru, berhenti di kecocokan pertama
+        if not verdict:
+            verdict = any(
+                self.allows(m["content"])
+                for m in reversed(messages[start:])
+                if m["role"] == "user"
+            )
+
+        if messages:
+            self._remember(hashes[-1], verdict)
+        return verdict
+
+    def _remember(self, key: int, verdict: bool):
+        self._verdicts[key] = verdict
+        self._verdicts.move_to_end(key)
+        while len(self._verdicts) > self.cache_size:
+            self._verdicts.popitem(last=False)
+
+
+def _prefix_keys(messages: list[dict]) -> list[int]:
+    # hash() bawaan jauh lebih murah daripada sha256 dan cukup untuk cache dalam proses
+    keys, key = [], 0
+    for message in messages:
+        key = hash((key, message["role"], message["content"]))
+        keys.append(key)
+    return keys
+
+
+def create_law_gate(classifier: TfidfClassifier | None = None, threshold: float = 0.5) -> TopicGate:
+    return TopicGate("hukum", KeywordMatcher(LEGAL_TERMS), classifier=classifier, threshold=threshold)
+
+
+def create_farm_gate(classifier: TfidfClassifier | None = None, threshold: float = 0.3) -> TopicGate:
+    # Pertanyaan FarmSmart biasanya pendek dan implisit ("kapan waktu terbaik?"),
+    # jadi tanpa classifier yang tidak jelas terlarang tetap diloloskan
+    return TopicGate(
+        "pertanian",
+        KeywordMatcher(FARM_TERMS),
+        blocked=KeywordMatcher(FARM_BLOCKED_TERMS),
+        classifier=classifier,
+        threshold=threshold,
+        default=True,
+    )
@@ -0,0 +1,155 @@
+"""Bangun indeks BM25 dan tabel lookup pasal dari file teks peraturan.
+
+    python ingest_laws.py data/laws data/law_index
+
+Setiap file ``<id>.txt`` di folder sumber berisi satu peraturan; ``<id>``
+(huruf kecil) menjadi kode UU-nya. Baris kepala opsional sebelum pasal pertama:
+
+    Nama: Kitab Undang-Undang Hukum Pidana
+    Alias: kuhp, kitab undang-undang hukum pidana
+
+Alias (dan ``<id>``) harus unik di seluruh folder; alias ganda ditolak.
+
+Setiap pasal diawali baris tersendiri ``Pasal <nomor>`` (mis. ``Pasal 362``
+atau ``Pasal 27A``); teks sampai pasal berikutnya menjadi satu dokumen.
+"""
+import argparse
+import array
+import json
+import os
+import re
+import sys
+import time
+from collections import Counter
+
+from legal_index import analyze
+
+_ARTICLE_LINE_RE = re.compile(r"^\s*pasal\s+(\d+[a-z]?)\s*$", re.IGNORECASE | re.MULTILINE)
+_HEADER_RE = re.compile(r"^\s*(nama|alias)\s*:\s*(.+)$", re.IGNORECASE | re.MULTILINE)
+
+
+def parse_law(text: str) -> tuple[dict, list[tuple[str, str]]]:
+    """Pisahkan satu file menjadi info UU dan daftar (nomor pasal, teks)."""
+    matches = list(_ARTICLE_LINE_RE.finditer(text))
+    header = text[: matches[0].start()] if matches else text
+    info = {"name": None, "aliases": []}
+    for key, value in _HEADER_RE.findall(header):
+        if key.lower() == "nama":
+            info["name"] = value.strip()
+        else:
+            info["aliases"] = [alias.strip().lower() for alias in value.split(",") if alias.strip()]
+
+    articles = []
+    for i, match in enumerate(matches):
+        end = matches[i + 1].start() if i + 1 < len(matches) else len(text)
+        body = " ".join(text[match.end():end].split())
+        if body:
+            articles.append((match.group(1).upper(), body))
+    return info, articles
+
+
+def build_index(source: str, target: str, k1: float = 1.2, b: float = 0.75) -> dict:
+    laws: dict[str, dict] = {}
+    docs: list[list[str]] = []
+    texts: list[bytes] = []
+    doc_terms: list[Counter] = []
+
+    for filename in sorted(os.listdir(source)):
+        if not filename.endswith(".txt"):
+            continue
+        law = os.path.splitext(filename)[0].lower()
+        with open(os.path.join(source, filename), encoding="utf-8") as f:
+            info, articles = parse_law(f.read())
+        laws[law] = {"name": info["name"] or law.upper(), "aliases": info["aliases"]}
+        for article, body in articles:
+            docs.append([law, article])
+            texts.append(body.encode("utf-8"))
+            doc_terms.append(Counter(analyze(body)))
+
+    if not docs:
+        raise SystemExit(f"Tidak ada pasal ditemukan di {source}")
+
+    # Alias ganda membuat "pasal N <alias>" bisa dijawab dari UU yang salah
+    owners: dict[str, list[str]] = {}
+    for law, info in laws.items():
+        for alias in dict.fromkeys([law, *info["aliases"]]):
+            owners.setdefault(alias, []).append(law)
+    conflicts = {alias: owner for alias, owner in owners.items() if len(owner) > 1}
+    if conflicts:
+        details = ", ".join(f"'{alias}' ({' & '.join(owner)})" for alias, owner in sorted(conflicts.items()))
+        raise SystemExit(f"Alias dipakai lebih dari satu peraturan: {details}")
+
+    # Posting dikelompokkan per term agar satu term = satu rentang kontigu di file
+    postings: dict[str, list[tuple[int, int]]] = {}
+    for doc_id, terms in enumerate(doc_terms):
+        for term, tf in terms.items():
+            postings.setdefault(term, []).append((doc_id, min(tf, 65535)))
+
+    vocab = {}
+    postings_doc, postings_tf = array.array("I"), array.array("H")
+    for term in sorted(postings):
+        entries = postings[term]
+        vocab[term] = [len(entries), len(postings_doc)]
+        for doc_id, tf in entries:
+            postings_doc.append(doc_id)
+            postings_tf.append(tf)
+
+    doc_len = array.array("I", (sum(terms.values()) for terms in doc_terms))
+    text_offsets = array.array("Q", [0])
+    for text in texts:
+        text_offsets.append(text_offsets[-1] + len(text))
+
+    os.makedirs(target, exist_ok=True)
+    for name, data in (
+        ("postings_doc.bin", postings_doc),
+        ("postings_tf.bin", postings_tf),
+        ("doc_len.bin", doc_len),
+        ("text_offsets.bin", text_offsets),
+    ):
+        _write(target, name, data.tobytes())
+    _write(target, "text.bin", b"".join(texts))
+    _write(target, "vocab.json", json.dumps(vocab, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+    _write(target, "docs.json", json.dumps(docs, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+
+    meta = {
+        "version": 1,
+        "k1": k1,
+        "b": b,
+        "avgdl": sum(doc_len) / len(doc_len),
+        "byteorder": sys.byteorder,
+        "laws": laws,
+        "documents": len(docs),
+        "terms": len(vocab),
+        "built_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+    }
+    # meta.json ditulis terakhir: indeks yang setengah jadi tidak akan dimuat
+    _write(target, "meta.json", json.dumps(meta, ensure_ascii=False, indent=2).encode("utf-8"))
+    return meta
+
+
+def _write(target: str, name: str, data: bytes):
+    # Ganti lewat rename agar proses yang sedang mmap file lama tidak terganggu
+    path = os.path.join(target, name)
+    with open(path + ".tmp", "wb") as f:
+        f.write(data)
+    os.replace(path + ".tmp", path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("source", help="folder berisi file <id>.txt")
+    parser.add_argument("target", help="folder tujuan indeks")
+    parser.add_argument("--k1", type=float, default=1.2)
+    parser.add_argument("--b", type=float, default=0.75)
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    meta = build_index(args.source, args.target, k1=args.k1, b=args.b)
+    print(
+        f"✅ {meta['documents']} pasal dari {len(meta['laws'])} peraturan, {meta['terms']} term "
+        f"({time.perf_counter() - start:.2f} detik) -> {args.target}"
+    )
+
+
+if __name__ == "__main__":
+    main()
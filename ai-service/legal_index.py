@@ -0,0 +1,230 @@
+"""Indeks BM25 offline atas teks peraturan, plus lookup langsung (UU, pasal).
+
+Indeks dibangun oleh ``ingest_laws.py`` ke sebuah folder:
+
+- ``meta.json``       parameter BM25, daftar UU beserta aliasnya
+- ``vocab.json``      term -> [df, offset posting]
+- ``postings_doc.bin`` / ``postings_tf.bin``  posting (uint32 / uint16), di-mmap
+- ``doc_len.bin``     panjang tiap pasal dalam term (uint32), di-mmap
+- ``text.bin`` / ``text_offsets.bin``  teks pasal UTF-8 dan offset-nya (uint64), di-mmap
+- ``docs.json``       [uu, nomor pasal] per dokumen
+"""
+import heapq
+import json
+import math
+import mmap
+import os
+import re
+import sys
+from functools import lru_cache
+
+### ==== Analisis teks ====
+
+STOPWORDS = frozenset("""
+ada adalah agar akan aku anda apa apabila atas atau bagaimana bagi bahwa baik bila bisa dalam
+dan dapat dari dengan di dia hal harus hanya ini itu jika juga kami kamu karena ke kepada
+maka masih mereka oleh pada para saat saja sama saya sebagai sebagaimana secara sedang
+sehingga seorang serta setiap sudah tanpa telah tentang tersebut tidak untuk yaitu yakni yang
+pasal ayat huruf angka
+""".split())
+
+# Sisa pertanyaan setelah rujukan pasal dibuang; bila hanya kata-kata ini, pengguna
+# sekadar meminta teks pasal ("apa isi pasal 362 KUHP?") dan tidak perlu dijawab LLM
+LOOKUP_WORDS = frozenset("""
+apa apakah isi isinya bunyi bunyinya berbunyi itu yang tentang mengatur diatur teks lengkap
+kutip kutipan tunjukkan tampilkan sebutkan berikan tolong mohon minta coba dong ya kak min
+dan serta dari dalam ayat huruf
+""".split())
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_PARTICLES = ("lah", "kah", "tah", "pun")
+_POSSESSIVES = ("nya", "ku", "mu")
+_SUFFIXES = ("kan", "an")  # "-i" dilewati: terlalu banyak kata dasar berakhiran i
+_PREFIXES = ("meng", "meny", "mem", "men", "me", "peng", "peny", "pem", "pen", "per", "pe",
+             "ber", "be", "ter", "te", "di", "ke", "se")
+_VOWELS = frozenset("aiueo")
+_RECODE = {"men": "t", "pen": "t", "meny": "s", "peny": "s", "mem": "m", "pem": "m"}
+_MIN_STEM = 4
+
+
+@lru_cache(maxsize=65536)
+def stem(word: str) -> str:
+    """Stemmer ringan bahasa Indonesia berbasis aturan (tanpa kamus).
+
+    Membuang partikel, kata ganti milik, akhiran, lalu awalan, selama sisa
+    kata tidak lebih pendek dari ``_MIN_STEM`` huruf.
+    """
+    if len(word) <= _MIN_STEM or word.isdigit():
+        return word
+    for group in (_PARTICLES, _POSSESSIVES, _SUFFIXES):
+        for suffix in group:
+            if word.endswith(suffix) and len(word) - len(suffix) >= _MIN_STEM:
+                word = word[: -len(suffix)]
+                break
+    for _ in range(2):
+        for prefix in _PREFIXES:
+            if not word.startswith(prefix):
+                continue
+            rest = word[len(prefix):]
+            # Peluluhan: me(n)+tulis -> menulis, pe(ny)+sewa -> penyewa, me(m)+milik -> memiliki
+            if rest and rest[0] in _VOWELS and prefix in _RECODE:
+                rest = _RECODE[prefix] + rest
+            if len(rest) >= _MIN_STEM:
+                word = rest
+                break
+        else:
+            break
+    return word
+
+
+def analyze(text: str) -> list[str]:
+    return [stem(token) for token in _TOKEN_RE.findall(text.lower()) if token not in STOPWORDS]
+
+
+### ==== Pembacaan indeks ====
+
+_ARTICLE_RE = r"pasal\s+(\d+[a-z]?)"
+
+
+class LegalIndex:
+    """Indeks yang sudah dibangun; data besar dibaca lewat mmap tanpa disalin."""
+
+    def __init__(self, path: str):
+        with open(os.path.join(path, "meta.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+        with open(os.path.join(path, "vocab.json"), encoding="utf-8") as f:
+            self.vocab: dict[str, list[int]] = json.load(f)
+        with open(os.path.join(path, "docs.json"), encoding="utf-8") as f:
+            self.docs: list[list[str]] = json.load(f)
+
+        if meta["byteorder"] != sys.byteorder:
+            raise RuntimeError("Indeks dibangun di mesin dengan byte order berbeda; bangun ulang dengan ingest_laws.py")
+
+        self.k1 = meta["k1"]
+        self.b = meta["b"]
+        self.avgdl = meta["avgdl"]
+        self.laws: dict[str, dict] = meta["laws"]
+        self.n_docs = len(self.docs)
+
+        self._views: list[memoryview] = []
+        self._maps: list[mmap.mmap] = []
+        self._postings_doc = self._open(path, "postings_doc.bin", "I")
+        self._postings_tf = self._open(path, "postings_tf.bin", "H")
+        self._doc_len = self._open(path, "doc_len.bin", "I")
+        # Normalisasi panjang BM25 per dokumen cukup dihitung sekali saat muat
+        self._norms = [self.k1 * (1 - self.b + self.b * n / self.avgdl) for n in self._doc_len]
+        self._text_offsets = self._open(path, "text_offsets.bin", "Q")
+        self._text = self._open(path, "text.bin", None)
+
+        # Tabel lookup (uu, pasal) -> dokumen; bila nomor pasal berulang, yang pertama dipakai
+        self.articles: dict[tuple[str, str], int] = {}
+        for doc_id, (law, article) in enumerate(self.docs):
+            self.articles.setdefault((law, article.lower()), doc_id)
+
+        # ingest_laws.py menolak alias ganda; indeks lama atau hasil edit tangan tetap
+        # diperiksa agar lookup langsung tidak menjawab dari UU yang salah
+        owners: dict[str, set[str]] = {}
+        for law, info in self.laws.items():
+            for alias in [law, *info.get("aliases", [])]:
+                owners.setdefault(alias.lower(), set()).add(law)
+        aliases = {alias: laws.pop() for alias, laws in owners.items() if len(laws) == 1}
+        for alias in owners.keys() - aliases.keys():
+            print(f"⚠️ Alias '{alias}' dipakai beberapa UU, diabaikan untuk lookup langsung")
+        self._aliases = aliases
+
+        # Alias terpanjang dicoba lebih dulu ("kuhperdata" sebelum "kuhp").
+        # Dua urutan diterima: "pasal 362 kuhp" dan "kuhp pasal 362".
+        alias = "(" + "|".join(re.escape(a) for a in sorted(aliases, key=len, reverse=True)) + ")"
+        self._lookup_re = re.compile(
+            _ARTICLE_RE + r"(?:\s+ayat\s*\(?\d+\)?)?\s+(?:dari\s+|dalam\s+)?" + alias + r"\b"
+            + r"|\b" + alias + r"\s+" + _ARTICLE_RE + r"\b"
+        ) if aliases else None
+
+    def _open(self, path: str, name: str, typecode: str | None):
+        with open(os.path.join(path, name), "rb") as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._maps.append(mapped)
+        view = memoryview(mapped)
+        self._views.append(view)
+        if typecode:
+            view = view.cast(typecode)
+            self._views.append(view)
+        return view
+
+    def text(self, doc_id: int) -> str:
+        start, end = self._text_offsets[doc_id], self._text_offsets[doc_id + 1]
+        return bytes(self._text[start:end]).decode("utf-8")
+
+    def passage(self, doc_id: int) -> dict:
+        law, article = self.docs[doc_id]
+        return {"law": law, "name": self.laws[law]["name"], "article": article, "text": self.text(doc_id)}
+
+    ### ---- Lookup langsung ----
+
+    def references(self, query: str) -> list[tuple[str, str]]:
+        """Semua rujukan "pasal N <UU>" atau "<UU> pasal N" di dalam pertanyaan, berurutan."""
+        if self._lookup_re is None:
+            return []
+        found = []
+        for match in self._lookup_re.finditer(query.lower()):
+            if match.group(1) is not None:
+                found.append((self._aliases[match.group(2)], match.group(1)))
+            else:
+                found.append((self._aliases[match.group(3)], match.group(4)))
+        return list(dict.fromkeys(found))
+
+    def find_reference(self, query: str) -> tuple[str, str] | None:
+        found = self.references(query)
+        return found[0] if found else None
+
+    def is_lookup(self, query: str) -> bool:
+        """Pertanyaan hanya meminta teks pasal: selain rujukannya, isinya cuma ``LOOKUP_WORDS``.
+
+        "Apa bedanya pasal 362 KUHP dengan ..." atau "apakah saya bisa dijerat
+        pasal 362 KUHP karena ..." bukan lookup dan tetap perlu dijawab.
+        """
+        if self._lookup_re is None:
+            return False
+        lowered = query.lower()
+        rest, count = self._lookup_re.subn(" ", lowered)
+        return count > 0 and all(
+            token in LOOKUP_WORDS or token.isdigit() for token in _TOKEN_RE.findall(rest)
+        )
+
+    def lookup(self, law: str, article: str) -> dict | None:
+        doc_id = self.articles.get((law, article.lower()))
+        return None if doc_id is None else self.passage(doc_id)
+
+    ### ---- BM25 ----
+
+    def search(self, query: str, k: int = 3, min_score: float = 0.0) -> list[dict]:
+        scores: dict[int, float] = {}
+        norms = self._norms
+        for term in set(analyze(query)):
+            entry = self.vocab.get(term)
+            if entry is None:
+                continue
+            df, offset = entry
+            weight = math.log(1 + (self.n_docs - df + 0.5) / (df + 0.5)) * (self.k1 + 1)
+            docs = self._postings_doc[offset:offset + df]
+            tfs = self._postings_tf[offset:offset + df]
+            for doc_id, tf in zip(docs, tfs):
+                scores[doc_id] = scores.get(doc_id, 0.0) + weight * tf / (tf + norms[doc_id])
+
+        top = heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+        return [{**self.passage(doc_id), "score": round(score, 3)} for doc_id, score in top if score >= min_score]
+
+    def close(self):
+        # memoryview harus dilepas (turunan lebih dulu) sebelum mmap ditutup
+        for view in reversed(self._views):
+            view.release()
+        for mapped in self._maps:
+            mapped.close()
+
+
+def load_index(path: str | None) -> LegalIndex | None:
+    """Muat indeks bila ada; tanpa indeks, /ask-law tetap berjalan tanpa grounding."""
+    if not path or not os.path.exists(os.path.join(path, "meta.json")):
+        return None
+    return LegalIndex(path)
+
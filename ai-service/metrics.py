@@ -0,0 +1,163 @@
+import cProfile
+import io
+import pstats
+import threading
+import time
+
+import groq
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+from prometheus_client.core import REGISTRY, CounterMetricFamily, GaugeMetricFamily
+
+# Label endpoint dibatasi ke rute yang dikenal agar kardinalitas tetap kecil
+ENDPOINTS = ("/ask-law", "/ask-farm", "/ask-farm/batch")
+
+_LATENCY_BUCKETS = (0.005, 0.025, 0.1, 0.25, 0.5, 1, 2, 4, 8, 15, 30, 60, 120)
+
+REQUEST_LATENCY = Histogram(
+    "ai_request_duration_seconds", "Durasi request per endpoint, termasuk streaming", ["endpoint"],
+    buckets=_LATENCY_BUCKETS,
+)
+REQUESTS_IN_FLIGHT = Gauge("ai_requests_in_flight", "Request yang sedang diproses", ["endpoint"])
+UPSTREAM_LATENCY = Histogram(
+    "ai_upstream_duration_seconds", "Durasi total panggilan completion upstream", ["model", "stream"],
+    buckets=_LATENCY_BUCKETS,
+)
+UPSTREAM_TTFT = Histogram(
+    "ai_upstream_time_to_first_token_seconds", "Waktu sampai token pertama dari upstream (streaming)", ["model"],
+    buckets=_LATENCY_BUCKETS,
+)
+TOKENS = Counter("ai_tokens_total", "Token menurut usage completion", ["model", "kind"])
+LAW_INDEX_ANSWERS = Counter("ai_law_index_answers_total", "Pertanyaan pasal yang dijawab langsung dari indeks")
+GATE_REJECTIONS = Counter("ai_gate_rejections_total", "Request yang ditolak gate topik", ["endpoint"])
+ERRORS = Counter("ai_errors_total", "Kegagalan menurut penyebab", ["cause"])
+
+
+def record_usage(model: str, usage: dict | None):
+    if not usage:
+        return
+    for kind in ("prompt_tokens", "completion_tokens", "total_tokens"):
+        TOKENS.labels(model, kind.removesuffix("_tokens")).inc(usage.get(kind) or 0)
+
+
+def record_error(e: Exception):
+    """Catat kegagalan yang berakhir 500; busy/rate limit/timeout dicatat di upstream."""
+    ERRORS.labels("upstream" if isinstance(e, groq.APIError) else "internal").inc()
+
+
+class StatsCollector:
+    """Membaca statistik cache dan scheduler saat scrape, bukan di jalur request."""
+
+    def __init__(self, caches: dict, scheduler):
+        self.caches = caches
+        self.scheduler = scheduler
+
+    def collect(self):
+        lookups = CounterMetricFamily("ai_cache_events", "Kejadian cache menurut jenis", labels=["cache", "event"])
+        entries = GaugeMetricFamily("ai_cache_entries", "Jumlah entri cache di memori", labels=["cache"])
+        for name, response_cache in self.caches.items():
+            snapshot = response_cache.snapshot()
+            for event in ("hits", "stale_hits", "misses", "coalesced", "refreshes", "errors"):
+                lookups.add_metric([name, event], snapshot[event])
+            entries.add_metric([name], snapshot["entries"])
+        yield lookups
+        yield entries
+
+        yield GaugeMetricFamily("ai_upstream_active", "Panggilan upstream yang memegang slot", value=self.scheduler.active)
+        yield GaugeMetricFamily("ai_upstream_queued", "Panggilan upstream yang menunggu slot", value=self.scheduler.queued)
+        scheduler_events = CounterMetricFamily("ai_scheduler_events", "Retry, fallback, dan penolakan", labels=["event"])
+        for event in ("retries", "fallbacks", "rejected"):
+            scheduler_events.add_metric([event], self.scheduler.stats[event])
+        yield scheduler_events
+        breaker = GaugeMetricFamily("ai_circuit_open", "1 bila circuit breaker model terbuka", labels=["model"])
+        for model, state in self.scheduler.snapshot()["models"].items():
+            breaker.add_metric([model], 0 if state["breaker"] == "closed" else 1)
+        yield breaker
+
+
+def register_collector(caches: dict, scheduler):
+    REGISTRY.register(StatsCollector(caches, scheduler))
+
+
+def render() -> tuple[bytes, str]:
+    return generate_latest(), CONTENT_TYPE_LATEST
+
+
+### ==== Middleware ====
+
+class MetricsMiddleware:
+    """Middleware ASGI murni: satu perf_counter dan satu observe per request."""
+
+    def __init__(self, app, profiler: "SamplingProfiler | None" = None):
+        self.app = app
+        self.profiler = profiler
+        self._children = {
+            endpoint: (REQUEST_LATENCY.labels(endpoint), REQUESTS_IN_FLIGHT.labels(endpoint))
+            for endpoint in ENDPOINTS
+        }
+
+    async def __call__(self, scope, receive, send):
+        children = self._children.get(scope.get("path")) if scope["type"] == "http" else None
+        if children is None:
+            await self.app(scope, receive, send)
+            return
+
+        latency, in_flight = children
+        profile = self.profiler.start() if self.profiler is not None else None
+        in_flight.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            latency.observe(time.perf_counter() - start)
+            in_flight.dec()
+            if profile is not None:
+                self.profiler.stop(profile)
+
+
+### ==== Profiling sampel ====
+
+class SamplingProfiler:
+    """Profil wall-clock (cProfile) untuk satu dari setiap ``every`` request.
+
+    Hanya satu request diprofil pada satu waktu. Karena event loop dipakai
+    bersama, coroutine lain yang berjalan selama sampel ikut tercatat.
+    """
+
+    def __init__(self, every: int):
+        self.every = every
+        self.samples = 0
+        self._count = 0
+        self._busy = False
+        self._lock = threading.Lock()
+        self._stats: pstats.Stats | None = None
+
+    def start(self) -> cProfile.Profile | None:
+        self._count += 1
+        if self._busy or self._count % self.every:
+            return None
+        self._busy = True
+        profile = cProfile.Profile(time.perf_counter)
+        profile.enable()
+        return profile
+
+    def stop(self, profile: cProfile.Profile):
+        profile.disable()
+        self._busy = False
+        with self._lock:
+            if self._stats is None:
+                self._stats = pstats.Stats(profile)
+            else:
+                self._stats.add(profile)
+            self.samples += 1
+
+    def dump(self, limit: int = 50, reset: bool = False) -> str:
+        with self._lock:
+            if self._stats is None:
+                return "Belum ada sampel profil.\n"
+            out = io.StringIO()
+            self._stats.stream = out
+            out.write(f"{self.samples} sampel\n")
+            self._stats.sort_stats("cumulative").print_stats(limit)
+            if reset:
+                self._stats, self.samples = None, 0
+            return out.getvalue()
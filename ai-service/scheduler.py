@@ -0,0 +1,408 @@
+import asyncio
+import bisect
+import itertools
+import random
+import re
+import time
+from dataclasses import dataclass, field
+from enum import IntEnum
+
+
+class Priority(IntEnum):
+    """Kelas prioritas; nilai lebih kecil dilayani lebih dulu."""
+    INTERACTIVE = 0
+    BATCH = 1
+    BACKGROUND = 2
+
+
+class Busy(Exception):
+    """Antrean penuh atau waktu tunggu slot habis."""
+
+
+@dataclass
+class Failure:
+    """Kegagalan upstream yang layak dicoba ulang (429, timeout, 5xx)."""
+    retry_after: float | None = None
+    headers: dict | None = None
+
+
+### ==== Token bucket ====
+
+class TokenBucket:
+    """Bucket per menit di sisi klien; ``per_minute <= 0`` berarti tanpa batas
+    sampai header rate-limit dari upstream memberi tahu batasnya."""
+
+    def __init__(self, per_minute: float):
+        self.capacity = per_minute if per_minute > 0 else None
+        self.tokens = self.capacity or 0.0
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+
+    def _refill(self, now: float):
+        if self.capacity is not None:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.capacity / 60)
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        if now < self.blocked_until:
+            return self.blocked_until - now
+        if self.capacity is None:
+            return 0.0
+        self._refill(now)
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) * 60 / self.capacity
+
+    def take(self, amount: float, now: float):
+        self._refill(now)
+        if self.capacity is not None:
+            # Boleh negatif: pemakaian aktual yang melebihi perkiraan dibayar belakangan
+            self.tokens = min(self.capacity, self.tokens - amount)
+
+    def block(self, seconds: float, now: float):
+        self.blocked_until = max(self.blocked_until, now + seconds)
+
+    def sync(self, now: float, remaining: float | None, reset: float | None, limit: float | None = None):
+        """Samakan dengan header ``x-ratelimit-*`` yang dikirim upstream."""
+        if limit:
+            if self.capacity is None:
+                self.tokens = limit
+            self.capacity = limit
+        self._refill(now)
+        if remaining is not None and self.capacity is not None:
+            self.tokens = min(self.tokens, remaining)
+        if remaining is not None and remaining <= 0 and reset:
+            self.block(reset, now)
+
+
+### ==== Circuit breaker ====
+
+class CircuitBreaker:
+    """Terbuka setelah ``threshold`` kegagalan beruntun; setelah ``cooldown``
+    satu request percobaan dilepas ke model utama (half-open)."""
+
+    def __init__(self, threshold: int, cooldown: float):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at: float | None = None
+        self._probing = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        return "half_open" if self._probing else "open"
+
+    def allow(self, now: float) -> bool:
+        if self.opened_at is None:
+            return True
+        if not self._probing and now - self.opened_at >= self.cooldown:
+            self._probing = True
+            return True
+        return False
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self._probing = False
+
+    def release_probe(self):
+        """Percobaan batal tanpa hasil (mis. klien putus); izinkan percobaan berikutnya."""
+        self._probing = False
+
+    def record_failure(self, now: float):
+        self.failures += 1
+        if self._probing or self.failures >= self.threshold:
+            self.opened_at = now
+        self._probing = False
+
+
+### ==== Scheduler ====
+
+@dataclass
+class Lane:
+    """Batas dan kesehatan satu model upstream."""
+    requests: TokenBucket
+    tokens: TokenBucket
+    breaker: CircuitBreaker
+
+    def wait_time(self, est_tokens: float, now: float) -> float:
+        return max(self.requests.wait_time(1, now), self.tokens.wait_time(est_tokens, now))
+
+
+@dataclass(order=True)
+class _Waiter:
+    priority: int
+    seq: int
+    model: str = field(compare=False)
+    est_tokens: float = field(compare=False)
+    future: asyncio.Future = field(compare=False)
+
+
+class Lease:
+    """Slot yang sedang dipakai; panggil ``release`` dengan pemakaian token aktual."""
+
+    def __init__(self, scheduler: "Scheduler", model: str, est_tokens: float, result):
+        self.model = model
+        self.result = result
+        self._scheduler = scheduler
+        self._est_tokens = est_tokens
+        self._released = False
+
+    def release(self, used_tokens: float | None = None):
+        if self._released:
+            return
+        self._released = True
+        self._scheduler._release(self.model, self._est_tokens, used_tokens)
+
+
+class Scheduler:
+    """Penjadwal semua panggilan completion ke upstream.
+
+    - Slot konkurensi dan antrean berprioritas dengan panjang dan waktu tunggu terbatas.
+    - Token bucket RPM/TPM per model, disamakan dengan header rate-limit tiap respons.
+    - Retry dengan jitter untuk kegagalan sementara; ``retry-after`` memblokir bucket model itu.
+    - Circuit breaker per model; saat terbuka, atau saat model utama harus menunggu
+      lebih dari ``fallback_wait`` detik, request dialihkan ke model cadangan.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_concurrency: int,
+        max_queue: int,
+        queue_timeouts: dict[Priority, float],
+        limits: dict[str, tuple[float, float]],
+        fallbacks: dict[str, str],
+        classify,
+        max_retries: int = 2,
+        backoff_base: float = 0.5,
+        backoff_max: float = 8.0,
+        fallback_wait: float = 2.0,
+        breaker_threshold: int = 5,
+        breaker_cooldown: float = 30.0,
+    ):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeouts = queue_timeouts
+        self.fallbacks = fallbacks
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.fallback_wait = fallback_wait
+        self._classify = classify  # Exception -> Failure | None
+        self._limits = limits
+        self._breaker_args = (breaker_threshold, breaker_cooldown)
+        self._lanes: dict[str, Lane] = {}
+        self._waiters: list[_Waiter] = []
+        self._seq = itertools.count()
+        self._active = 0
+        self._timer: asyncio.TimerHandle | None = None
+        self.stats = {"retries": 0, "fallbacks": 0, "rejected": 0}
+
+    def lane(self, model: str) -> Lane:
+        lane = self._lanes.get(model)
+        if lane is None:
+            rpm, tpm = self._limits.get(model, (0, 0))
+            lane = Lane(TokenBucket(rpm), TokenBucket(tpm), CircuitBreaker(*self._breaker_args))
+            self._lanes[model] = lane
+        return lane
+
+    @property
+    def active(self) -> int:
+        return self._active
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    ### ---- Pemilihan model ----
+
+    def choose_model(self, model: str, est_tokens: float) -> str:
+        fallback = self.fallbacks.get(model)
+        if not fallback:
+            return model
+        now = time.monotonic()
+        lane = self.lane(model)
+        if lane.wait_time(est_tokens, now) > self.fallback_wait or not lane.breaker.allow(now):
+            self.stats["fallbacks"] += 1
+            return fallback
+        return model
+
+    ### ---- Eksekusi dengan retry ----
+
+    async def run(self, call, *, model: str, priority: Priority, est_tokens: float) -> Lease:
+        """Jalankan ``call(model) -> (hasil, headers)`` di bawah penjadwal.
+
+        Mengembalikan ``Lease`` yang masih memegang slot; pemanggil wajib
+        memanggil ``lease.release()`` setelah respons (atau stream) selesai.
+        """
+        for attempt in range(self.max_retries + 1):
+            chosen = self.choose_model(model, est_tokens)
+            lane = self.lane(chosen)
+            # Selama half-open hanya pemegang percobaan yang diarahkan ke model ini
+            probe = lane.breaker.state == "half_open"
+            try:
+                await self.acquire(chosen, priority, est_tokens)
+            except BaseException:
+                # Busy atau klien putus saat antre: percobaan belum terjadi, kembalikan
+                if probe:
+                    lane.breaker.release_probe()
+                raise
+            try:
+                result, headers = await call(chosen)
+            except Exception as e:
+                self._release(chosen, est_tokens, None)
+                failure = self._classify(e)
+                if failure is None:
+                    # Upstream menjawab (mis. 400), jadi model itu sendiri sehat
+                    lane.breaker.record_success()
+                    raise
+                now = time.monotonic()
+                lane.breaker.record_failure(now)
+                if failure.headers:
+                    self.observe(chosen, failure.headers)
+                if failure.retry_after:
+                    lane.requests.block(failure.retry_after, now)
+                if attempt == self.max_retries:
+                    raise
+                self.stats["retries"] += 1
+                # Full jitter; menunggu retry-after sendiri ditangani oleh bucket yang diblokir
+                await asyncio.sleep(random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt)))
+                continue
+            except BaseException:
+                self._release(chosen, est_tokens, None)
+                if probe:
+                    lane.breaker.release_probe()
+                raise
+            lane.breaker.record_success()
+            self.observe(chosen, headers)
+            return Lease(self, chosen, est_tokens, result)
+
+    def observe(self, model: str, headers) -> None:
+        if not headers:
+            return
+        lane = self.lane(model)
+        now = time.monotonic()
+        lane.tokens.sync(
+            now,
+            _number(headers.get("x-ratelimit-remaining-tokens")),
+            parse_duration(headers.get("x-ratelimit-reset-tokens")),
+            _number(headers.get("x-ratelimit-limit-tokens")),
+        )
+        lane.requests.sync(
+            now,
+            _number(headers.get("x-ratelimit-remaining-requests")),
+            parse_duration(headers.get("x-ratelimit-reset-requests")),
+        )
+        retry_after = _number(headers.get("retry-after"))
+        if retry_after:
+            lane.requests.block(retry_after, now)
+
+    ### ---- Antrean ----
+
+    async def acquire(self, model: str, priority: Priority, est_tokens: float):
+        if not self._waiters and self._active < self.max_concurrency:
+            if self.lane(model).wait_time(est_tokens, time.monotonic()) <= 0:
+                self._grant(model, est_tokens)
+                return
+
+        if len(self._waiters) >= self.max_queue:
+            self.stats["rejected"] += 1
+            raise Busy()
+
+        waiter = _Waiter(priority, next(self._seq), model, est_tokens, asyncio.get_running_loop().create_future())
+        bisect.insort(self._waiters, waiter)
+        self._dispatch()
+        try:
+            await asyncio.wait_for(waiter.future, self.queue_timeouts.get(priority))
+        except BaseException as e:
+            if waiter.future.done() and not waiter.future.cancelled():
+                # Slot sudah diberikan tapi pemanggil batal; kembalikan
+                self._release(model, est_tokens, 0)
+            elif waiter in self._waiters:
+                self._waiters.remove(waiter)
+            if isinstance(e, asyncio.TimeoutError):
+                self.stats["rejected"] += 1
+                raise Busy()
+            raise
+
+    def _grant(self, model: str, est_tokens: float):
+        now = time.monotonic()
+        lane = self.lane(model)
+        lane.requests.take(1, now)
+        lane.tokens.take(est_tokens, now)
+        self._active += 1
+
+    def _release(self, model: str, est_tokens: float, used_tokens: float | None):
+        self._active -= 1
+        if used_tokens is not None:
+            self.lane(model).tokens.take(used_tokens - est_tokens, time.monotonic())
+        self._dispatch()
+
+    def _dispatch(self):
+        now = time.monotonic()
+        next_wake = None
+        blocked: set[str] = set()
+        i = 0
+        while i < len(self._waiters) and self._active < self.max_concurrency:
+            waiter = self._waiters[i]
+            if waiter.future.done() or waiter.model in blocked:
+                i += 1
+                continue
+            wait = self.lane(waiter.model).wait_time(waiter.est_tokens, now)
+            if wait > 0:
+                # Jangan biarkan prioritas rendah menyalip di model yang sama
+                blocked.add(waiter.model)
+                next_wake = wait if next_wake is None else min(next_wake, wait)
+                i += 1
+                continue
+            self._waiters.pop(i)
+            self._grant(waiter.model, waiter.est_tokens)
+            waiter.future.set_result(None)
+
+        if next_wake is not None:
+            if self._timer is not None:
+                self._timer.cancel()
+            self._timer = asyncio.get_running_loop().call_later(next_wake, self._dispatch)
+
+    def snapshot(self) -> dict:
+        return {
+            **self.stats,
+            "active": self._active,
+            "queued": len(self._waiters),
+            "models": {
+                model: {
+                    "breaker": lane.breaker.state,
+                    "requests_available": None if lane.requests.capacity is None else round(lane.requests.tokens, 1),
+                    "tokens_available": None if lane.tokens.capacity is None else round(lane.tokens.tokens),
+                }
+                for model, lane in self._lanes.items()
+            },
+        }
+
+
+_DURATION_RE = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+_UNITS = {"h": 3600.0, "m": 60.0, "s": 1.0, "ms": 0.001}
+
+
+def parse_duration(value: str | None) -> float | None:
+    """Parse format reset Groq/OpenAI seperti ``"2m59.56s"``, ``"120ms"`` atau ``"7"``."""
+    if not value:
+        return None
+    number = _number(value)
+    if number is not None:
+        return number
+    parts = _DURATION_RE.findall(value)
+    if not parts:
+        return None
+    return sum(float(amount) * _UNITS[unit] for amount, unit in parts)
+
+
+def _number(value) -> float | None:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
@@ -0,0 +1,85 @@
+import json
+from typing import Literal
+
+import metrics
+
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
+
+StreamFormat = Literal["sse", "ndjson"]
+
+_MEDIA_TYPES = {"sse": "text/event-stream", "ndjson": "application/x-ndjson"}
+
+# Nonaktifkan buffering proxy (nginx) agar token pertama langsung sampai ke klien
+_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+
+def encode_event(event: str, data: dict, format: StreamFormat) -> str:
+    if format == "ndjson":
+        return json.dumps({"type": event, **data}, ensure_ascii=False) + "\n"
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+def stream_response(
+    completion,
+    format: StreamFormat,
+    label: str,
+    on_complete=None,
+    extra: dict | None = None,
+    on_close=None,
+) -> StreamingResponse:
+    """Teruskan token dari ``upstream.CompletionStream`` ke klien.
+
+    Event ``token`` berisi potongan teks, event ``done`` berisi jawaban lengkap,
+    model yang menjawab, usage, dan isi ``extra`` (mis. sumber pasal). Bila klien
+    memutus koneksi, Starlette membatalkan generator ini dan ``completion.aclose()``
+    ikut menghentikan generasi di upstream. ``on_close`` dipanggil sekali setelah
+    stream ditutup, apa pun hasilnya.
+    """
+    closed = False
+
+    async def close():
+        nonlocal closed
+        if closed:
+            return
+        closed = True
+        try:
+            await completion.aclose()
+        finally:
+            if on_close is not None:
+                on_close()
+
+    async def events():
+        try:
+            async for delta in completion:
+                yield encode_event("token", {"delta": delta}, format)
+            result = {"answer": completion.text, "model": completion.model}
+            if on_complete is not None:
+                await on_complete(result)
+            yield encode_event("done", {**result, "usage": completion.usage, **(extra or {})}, format)
+        except Exception as e:
+            print(f"❌ Error stream {label}:", str(e))
+            metrics.record_error(e)
+            yield encode_event("error", {"detail": "Gagal menyelesaikan jawaban."}, format)
+        finally:
+            await close()
+
+    # Background task tetap jalan walau klien putus sebelum generator sempat dimulai
+    return StreamingResponse(
+        events(),
+        media_type=_MEDIA_TYPES[format],
+        headers=_HEADERS,
+        background=BackgroundTask(close),
+    )
+
+
+def static_response(
+    answer: str, format: StreamFormat, model: str | None = None, extra: dict | None = None
+) -> StreamingResponse:
+    """Jawaban yang sudah jadi (mis. penolakan topik) dalam format streaming yang sama."""
+
+    async def events():
+        yield encode_event("token", {"delta": answer}, format)
+        yield encode_event("done", {"answer": answer, "model": model, "usage": None, **(extra or {})}, format)
+
+    return StreamingResponse(events(), media_type=_MEDIA_TYPES[format], headers=_HEADERS)
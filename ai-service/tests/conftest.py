@@ -0,0 +1,54 @@
+import os
+import sys
+
+# Modul ai-service berupa file datar; jalankan pytest dari folder ai-service
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("GROQ_API_KEY", "test-key")
+
+import httpx  # noqa: E402
+import pytest  # noqa: E402
+from groq import AsyncGroq  # noqa: E402
+
+import config  # noqa: E402
+import upstream  # noqa: E402
+from bench import fake_groq  # noqa: E402
+
+
+class FakeUpstream:
+    """bench.fake_groq yang dipasang lewat ASGI, plus scheduler dengan jeda singkat."""
+
+    def __init__(self, monkeypatch):
+        self.settings = fake_groq.FakeSettings(fake_groq.parse_args([
+            "--latency", "0", "--tokens-per-second", "100000", "--completion-tokens", "16",
+        ]))
+        self.client = httpx.AsyncClient(transport=httpx.ASGITransport(app=fake_groq.create_app(self.settings)))
+        self._monkeypatch = monkeypatch
+        monkeypatch.setattr(upstream, "groq_client", AsyncGroq(
+            api_key="test-key", base_url="http://fake-groq", http_client=self.client, max_retries=0,
+        ))
+        self.use_scheduler()
+
+    def use_scheduler(self, **overrides):
+        # Scheduler baru per test agar antrean dan timer tidak terikat event loop test lain
+        options = dict(backoff_base=0.01, backoff_max=0.05, fallback_wait=0.5, breaker_cooldown=0.2)
+        self.scheduler = upstream.create_scheduler(**{**options, **overrides})
+        self._monkeypatch.setattr(upstream, "scheduler", self.scheduler)
+        return self.scheduler
+
+    def fail(self, models=(), **settings):
+        self.settings.fail_models = set(models)
+        for name, value in settings.items():
+            setattr(self.settings, name, value)
+
+    async def stats(self) -> dict:
+        return (await self.client.get("http://fake-groq/stats")).json()
+
+    def breaker(self, model: str = config.AI_MODEL) -> str:
+        return self.scheduler.lane(model).breaker.state
+
+
+@pytest.fixture
+def fake(monkeypatch):
+    return FakeUpstream(monkeypatch)
+
+
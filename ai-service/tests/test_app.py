@@ -0,0 +1,237 @@
+import asyncio
+
+import json
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+import app as service
+import cache
+import config
+import ingest_laws
+import legal_index
+import metrics
+
+KUHP = """Nama: Kitab Undang-Undang Hukum Pidana
+Alias: kuhp
+
+Pasal 362
+Barang siapa mengambil barang sesuatu yang seluruhnya atau sebagian kepunyaan orang lain,
+dengan maksud untuk dimiliki secara melawan hukum, diancam karena pencurian.
+
+Pasal 363
+Diancam dengan pidana penjara paling lama tujuh tahun pencurian ternak atau pencurian pada waktu malam.
+"""
+
+
+@pytest.fixture
+def client(fake):
+    # Tanpa context manager: lifespan menutup klien upstream yang dipakai bersama
+    return TestClient(service.app)
+
+
+@pytest.fixture
+def law_index(tmp_path, monkeypatch):
+    (tmp_path / "kuhp.txt").write_text(KUHP, encoding="utf-8")
+    ingest_laws.build_index(str(tmp_path), str(tmp_path / "index"))
+    index = legal_index.load_index(str(tmp_path / "index"))
+    monkeypatch.setattr(service, "law_index", index)
+    yield index
+    index.close()
+
+
+@pytest.fixture
+def farm_cache(monkeypatch):
+    memory = cache.ResponseCache(
+        ttl=60, stale_ttl=60, max_entries=100,
+        cacheable=lambda result: result["model"] == config.AI_MODEL,
+    )
+    monkeypatch.setattr(service, "farm_cache", memory)
+    return memory
+
+
+def ask_law(client, question: str, **params) -> dict:
+    response = client.post("/ask-law", params=params, json={"messages": [{"role": "user", "content": question}]})
+    assert response.status_code == 200
+    return response.json()
+
+
+### ==== /ask-law ====
+
+@pytest.mark.parametrize("question", [
+    "Apa isi pasal 362 KUHP?",
+    "pasal 362 kuhp",
+    "KUHP pasal 362 bunyinya apa ya?",
+])
+def test_article_lookup_answered_from_index(client, law_index, fake, question):
+    body = ask_law(client, question)
+
+    assert body["model"] is None
+    assert body["sources"] == [{"law": "kuhp", "article": "362"}]
+    assert "Pasal 362" in body["answer"] and "mengambil barang" in body["answer"]
+    assert asyncio.run(fake.stats())["requests"] == 0
+
+
+def test_multiple_article_lookup(client, law_index):
+    body = ask_law(client, "Tolong tampilkan isi pasal 362 KUHP dan pasal 363 KUHP")
+
+    assert body["model"] is None
+    assert body["sources"] == [{"law": "kuhp", "article": "362"}, {"law": "kuhp", "article": "363"}]
+
+
+@pytest.mark.parametrize(("question", "first"), [
+    ("Apa bedanya pasal 362 KUHP dengan pasal 363 KUHP?", "362"),
+    ("Apakah saya bisa dijerat pasal 362 KUHP karena memetik mangga tetangga?", "362"),
+    ("Kalau dilaporkan pasal 363 KUHP, apa yang harus saya lakukan?", "363"),
+])
+def test_question_about_article_goes_to_llm(client, law_index, question, first):
+    body = ask_law(client, question)
+
+    # Dijawab LLM, dengan pasal yang dirujuk di urutan teratas kutipan
+    assert body["model"] is not None
+    assert body["sources"][0] == {"law": "kuhp", "article": first}
+
+
+def test_comparison_pins_both_articles(client, law_index):
+    body = ask_law(client, "Apa bedanya pasal 362 KUHP dengan pasal 363 KUHP?")
+
+    assert body["sources"][:2] == [{"law": "kuhp", "article": "362"}, {"law": "kuhp", "article": "363"}]
+
+
+def test_unknown_article_goes_to_llm(client, law_index):
+    body = ask_law(client, "Apa isi pasal 999 KUHP?")
+
+    assert body["model"] is not None
+
+
+def test_streamed_lookup_includes_sources(client, law_index):
+    response = client.post(
+        "/ask-law", params={"stream": "true", "format": "ndjson"},
+        json={"messages": [{"role": "user", "content": "Apa isi pasal 362 KUHP?"}]},
+    )
+
+    assert '"sources": [{"law": "kuhp", "article": "362"}]' in response.text
+
+
+### ==== /ask-farm ====
+
+FARM = {"plant": "padi", "location": "Karawang", "question": "Kapan waktu terbaik memupuk padi?"}
+
+
+def test_concurrent_farm_streams_coalesced(fake, farm_cache):
+    fake.settings.latency = 0.2
+
+    async def run():
+        transport = httpx.ASGITransport(app=service.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://ai-service") as client:
+            responses = await asyncio.gather(*[
+                client.post("/ask-farm", params={"stream": "true", "format": "ndjson"}, json=FARM)
+                for _ in range(5)
+            ])
+        return responses, await fake.stats()
+
+    responses, stats = asyncio.run(run())
+
+    # Satu stream ke upstream, empat request lain menunggu hasilnya
+    assert all(r.status_code == 200 and '"answer"' in r.text for r in responses)
+    assert stats["requests"] == 1
+    assert farm_cache.stats["coalesced"] == 4
+
+
+
+### ==== /ask-farm/batch ====
+
+class StubCompute:
+    """Pengganti ``farm_compute`` yang mencatat paralelisme; tanaman "gagal" melempar error."""
+
+    def __init__(self):
+        self.calls = 0
+        self.active = 0
+        self.peak = 0
+
+    def __call__(self, messages: list[dict], priority):
+        async def compute() -> dict:
+            self.calls += 1
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+            try:
+                await asyncio.sleep(0.02)
+                if "menanam gagal" in messages[-1]["content"]:
+                    raise RuntimeError("upstream gagal")
+                return {"answer": "panduan", "model": config.AI_MODEL}
+            finally:
+                self.active -= 1
+        return compute
+
+
+@pytest.fixture
+def stub_compute(monkeypatch):
+    stub = StubCompute()
+    monkeypatch.setattr(service, "farm_compute", stub)
+    return stub
+
+
+def ask_batch(client, items: list[dict]) -> tuple[list[dict], dict]:
+    response = client.post("/ask-farm/batch", json={"items": items})
+    assert response.status_code == 200
+    events = [json.loads(line) for line in response.text.splitlines()]
+    results = sorted((e for e in events if e.pop("type") == "result"), key=lambda r: r["index"])
+    return results, events[-1]
+
+
+def test_batch_deduplicates_normalized_items(client, fake, farm_cache):
+    items = [
+        {"id": "a", "plant": "Padi", "location": "Karawang"},
+        {"id": "b", "plant": "  padi ", "location": "KARAWANG"},
+        {"id": "c", "plant": "jagung", "location": "Karawang"},
+    ]
+
+    results, done = ask_batch(client, items)
+
+    assert [r["id"] for r in results] == ["a", "b", "c"]
+    assert results[0]["answer"] == results[1]["answer"]
+    assert done == {"count": 3, "unique": 2, "failed": 0}
+    assert asyncio.run(fake.stats())["requests"] == 2
+
+
+def test_batch_reports_error_per_item(client, stub_compute, farm_cache):
+    items = [
+        {"plant": "padi", "location": "Karawang"},
+        {"plant": "gagal", "location": "Karawang"},
+    ]
+
+    results, done = ask_batch(client, items)
+
+    assert results[0]["answer"] == "panduan" and results[0]["error"] is None
+    assert results[1]["answer"] is None and results[1]["error"]
+    assert done["failed"] == 1
+
+
+def test_batch_parallelism_capped(client, stub_compute, farm_cache, monkeypatch):
+    monkeypatch.setattr(config, "FARM_BATCH_PARALLELISM", 3)
+
+    results, done = ask_batch(client, [{"plant": f"tanaman {n}", "location": "Bogor"} for n in range(10)])
+
+    assert done["failed"] == 0 and len(results) == 10
+    assert stub_compute.calls == 10
+    assert stub_compute.peak == 3
+
+
+def test_batch_too_large(client, monkeypatch):
+    monkeypatch.setattr(config, "FARM_BATCH_MAX_ITEMS", 2)
+
+    response = client.post("/ask-farm/batch", json={"items": [{"plant": "padi", "location": "Bogor"}] * 3})
+
+    assert response.status_code == 413
+
+
+def test_batch_gate_rejection_counted_for_batch(client, stub_compute, farm_cache):
+    rejections = metrics.GATE_REJECTIONS.labels("/ask-farm/batch")
+    before = rejections._value.get()
+
+    results, _ = ask_batch(client, [{"plant": "padi", "location": "Bogor", "question": "Apa isi pasal 362 KUHP?"}])
+
+    assert results[0]["answer"] == service.FARM_OFF_TOPIC_ANSWER
+    assert rejections._value.get() == before + 1
+    assert stub_compute.calls == 0
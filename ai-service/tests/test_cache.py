@@ -0,0 +1,175 @@
+import asyncio
+import types
+
+import pytest
+
+import cache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache, "time", types.SimpleNamespace(time=clock))
+    return clock
+
+
+def counter(value="jawaban", delay: float = 0.0):
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(delay)
+        return f"{value} {len(calls)}"
+
+    compute.calls = calls
+    return compute
+
+
+def test_lru_evicts_least_recently_used():
+    memory = cache.ResponseCache(ttl=60, stale_ttl=0, max_entries=2)
+
+    async def run():
+        await memory.store("a", 1)
+        await memory.store("b", 2)
+        assert await memory.lookup("a") == 1
+        await memory.store("c", 3)
+        return [await memory.peek(key) for key in "abc"]
+
+    assert asyncio.run(run()) == [1, None, 3]
+
+
+def test_stale_entry_served_and_refreshed(clock):
+    memory = cache.ResponseCache(ttl=10, stale_ttl=20, max_entries=10)
+    refresh = counter("baru")
+
+    async def run():
+        await memory.store("k", "lama")
+        clock.now += 5
+        assert await memory.lookup("k", refresh=refresh) == "lama"
+        assert not refresh.calls
+
+        clock.now += 10
+        # Basi: nilai lama langsung dikembalikan, pembaruan berjalan di latar belakang
+        assert await memory.lookup("k", refresh=refresh) == "lama"
+        await asyncio.sleep(0.01)
+        assert await memory.lookup("k", refresh=refresh) == "baru 1"
+
+    asyncio.run(run())
+
+    assert len(refresh.calls) == 1
+    assert memory.stats["hits"] == 2 and memory.stats["stale_hits"] == 1 and memory.stats["refreshes"] == 1
+
+
+def test_expired_entry_recomputed(clock):
+    memory = cache.ResponseCache(ttl=10, stale_ttl=20, max_entries=10)
+    compute = counter()
+
+    async def run():
+        await memory.store("k", "lama")
+        clock.now += 31
+        assert await memory.peek("k") is None
+        return await memory.get_or_compute("k", compute)
+
+    assert asyncio.run(run()) == "jawaban 1"
+    assert memory.stats["misses"] == 1
+
+
+def test_concurrent_misses_coalesced():
+    memory = cache.ResponseCache(ttl=60, stale_ttl=0, max_entries=10)
+    compute = counter(delay=0.05)
+
+    async def run():
+        return await asyncio.gather(*[memory.get_or_compute("k", compute) for _ in range(5)])
+
+    assert asyncio.run(run()) == ["jawaban 1"] * 5
+    assert len(compute.calls) == 1
+    assert memory.stats["coalesced"] == 4
+    assert memory.snapshot()["inflight"] == 0
+
+
+def test_failed_compute_reaches_all_waiters():
+    memory = cache.ResponseCache(ttl=60, stale_ttl=0, max_entries=10)
+
+    async def compute():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("upstream gagal")
+
+    async def run():
+        results = await asyncio.gather(*[memory.get_or_compute("k", compute) for _ in range(3)], return_exceptions=True)
+        return results, await memory.peek("k")
+
+    results, stored = asyncio.run(run())
+
+    assert all(isinstance(r, RuntimeError) for r in results)
+    assert stored is None
+    assert memory.stats["errors"] == 1
+
+
+def test_sqlite_survives_reopen(tmp_path):
+    path = str(tmp_path / "cache.db")
+
+    async def store():
+        disk = cache.ResponseCache(ttl=60, stale_ttl=0, max_entries=10, path=path)
+        await disk.store("k", {"answer": "tanam saat hujan", "model": "utama"})
+        disk.close()
+
+    async def load():
+        disk = cache.ResponseCache(ttl=60, stale_ttl=0, max_entries=10, path=path)
+        try:
+            return await disk.lookup("k")
+        finally:
+            disk.close()
+
+    asyncio.run(store())
+
+    assert asyncio.run(load()) == {"answer": "tanam saat hujan", "model": "utama"}
+
+
+def test_cacheable_rejects_fallback_answers():
+    memory = cache.ResponseCache(
+        ttl=60, stale_ttl=0, max_entries=10, cacheable=lambda result: result["model"] == "utama",
+    )
+
+    async def run():
+        await memory.store("cadangan", {"answer": "a", "model": "cadangan"})
+        await memory.store("utama", {"answer": "b", "model": "utama"})
+        return await memory.peek("cadangan"), await memory.peek("utama")
+
+    assert asyncio.run(run()) == (None, {"answer": "b", "model": "utama"})
+
+
+def test_claim_resolves_waiters():
+    memory = cache.ResponseCache(ttl=60, stale_ttl=0, max_entries=10)
+
+    async def run():
+        claim = memory.claim("k")
+        waiters = [asyncio.create_task(memory.join("k")) for _ in range(2)]
+        await asyncio.sleep(0)
+        await claim.resolve("hasil stream")
+        return await asyncio.gather(*waiters), await memory.peek("k")
+
+    assert asyncio.run(run()) == (["hasil stream"] * 2, "hasil stream")
+
+
+def test_abandoned_claim_lets_waiters_compute():
+    memory = cache.ResponseCache(ttl=60, stale_ttl=0, max_entries=10)
+    compute = counter()
+
+    async def run():
+        claim = memory.claim("k")
+        waiter = asyncio.create_task(memory.get_or_compute("k", compute))
+        await asyncio.sleep(0)
+        # Klien stream putus: penunggu tidak ikut gagal, ia menghitung sendiri
+        claim.fail()
+        return await waiter
+
+    assert asyncio.run(run()) == "jawaban 1"
+    assert memory.stats["errors"] == 0
@@ -0,0 +1,119 @@
+import asyncio
+
+import pytest
+
+import cache
+from compaction import Compactor, message_tokens
+
+SYSTEM = "sistem"
+BUDGET = 200
+
+
+def turn(n: int) -> dict:
+    # 20 kata = 24 token per pesan
+    return {"role": "user" if n % 2 == 0 else "assistant", "content": " ".join([f"k{n}"] * 20)}
+
+
+def conversation(length: int) -> list[dict]:
+    return [turn(n) for n in range(length)]
+
+
+class StubSummarize:
+    def __init__(self, fail: bool = False):
+        self.calls = []
+        self.fail = fail
+
+    async def __call__(self, previous, messages):
+        self.calls.append((previous, len(messages)))
+        if self.fail:
+            raise RuntimeError("ringkasan gagal")
+        return f"ringkasan {len(self.calls)}"
+
+
+@pytest.fixture
+def summarize():
+    return StubSummarize()
+
+
+def make_compactor(summarize) -> Compactor:
+    return Compactor(
+        budget=BUDGET,
+        recent_tokens=60,
+        summary_max_tokens=30,
+        summary_cache=cache.ResponseCache(ttl=60, stale_ttl=0, max_entries=100),
+        summarize=summarize,
+    )
+
+
+def total_tokens(prompt: list[dict]) -> int:
+    return sum(message_tokens(m) for m in prompt)
+
+
+def summary_of(prompt: list[dict]) -> str | None:
+    if len(prompt) > 1 and prompt[1]["role"] == "system":
+        return prompt[1]["content"].rsplit("\n", 1)[-1]
+    return None
+
+
+def test_short_conversation_untouched(summarize):
+    messages = conversation(4)
+
+    prompt = asyncio.run(make_compactor(summarize).compact(SYSTEM, messages))
+
+    assert prompt == [{"role": "system", "content": SYSTEM}, *messages]
+    assert not summarize.calls
+
+
+def test_long_conversation_fits_budget(summarize):
+    messages = conversation(12)
+
+    prompt = asyncio.run(make_compactor(summarize).compact(SYSTEM, messages))
+
+    assert total_tokens(prompt) <= BUDGET
+    assert prompt[-1] == messages[-1]
+    # Sepuluh pesan tergeser dilipat per potongan yang muat dalam anggaran
+    assert summarize.calls == [(None, 7), ("ringkasan 1", 3)]
+    assert summary_of(prompt) == "ringkasan 2"
+
+
+def test_summary_reused_next_turn(summarize):
+    compactor = make_compactor(summarize)
+
+    async def run():
+        await compactor.compact(SYSTEM, conversation(12))
+        return await compactor.compact(SYSTEM, conversation(13))
+
+    prompt = asyncio.run(run())
+
+    # Ringkasan giliran sebelumnya masih muat: tidak ada panggilan ringkasan baru
+    assert summary_of(prompt) == "ringkasan 2"
+    assert prompt[2:] == conversation(13)[10:]
+    assert total_tokens(prompt) <= BUDGET
+    assert len(summarize.calls) == 2
+
+
+def test_summary_folds_only_new_messages(summarize):
+    compactor = make_compactor(summarize)
+
+    async def run():
+        await compactor.compact(SYSTEM, conversation(12))
+        return await compactor.compact(SYSTEM, conversation(17))
+
+    prompt = asyncio.run(run())
+
+    # Ringkasan lama dilanjutkan dengan lima pesan yang baru tergeser
+    assert summarize.calls[2:] == [("ringkasan 2", 5)]
+    assert summary_of(prompt) == "ringkasan 3"
+    assert total_tokens(prompt) <= BUDGET
+
+
+def test_failed_summary_drops_oldest_messages():
+    summarize = StubSummarize(fail=True)
+    messages = conversation(12)
+
+    prompt = asyncio.run(make_compactor(summarize).compact(SYSTEM, messages))
+
+    # Tanpa ringkasan, pesan terlama dibuang agar tetap di bawah anggaran
+    assert summary_of(prompt) is None
+    assert prompt[1:] == messages[-len(prompt) + 1:]
+    assert total_tokens(prompt) <= BUDGET
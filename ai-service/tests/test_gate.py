@@ -0,0 +1,77 @@
+import os
+
+import pytest
+
+import gate
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data")
+
+# Batas bawah di data/gate_eval.jsonl; naikkan bila leksikon atau data seed membaik.
+# (presisi, recall) per gate; "leksikon" adalah konfigurasi produksi (AI_GATE_CLASSIFIER=0)
+FLOORS = {
+    ("hukum", False): (0.85, 0.6),
+    ("pertanian", False): (0.55, 0.95),
+    ("hukum", True): (0.8, 0.85),
+    ("pertanian", True): (0.8, 0.9),
+}
+
+
+@pytest.fixture(scope="module")
+def samples():
+    return gate.load_samples(os.path.join(DATA_DIR, "gate_eval.jsonl"))
+
+
+@pytest.fixture(scope="module")
+def classifier():
+    return gate.TfidfClassifier.train(gate.load_samples(os.path.join(DATA_DIR, "gate_seed.jsonl")))
+
+
+def create_gate(label: str, classifier):
+    return gate.create_law_gate(classifier) if label == "hukum" else gate.create_farm_gate(classifier)
+
+
+@pytest.mark.parametrize(("label", "with_classifier"), list(FLOORS))
+def test_eval_floors(samples, classifier, label, with_classifier):
+    topic_gate = create_gate(label, classifier if with_classifier else None)
+    tp = fp = fn = 0
+    for text, actual in samples:
+        predicted = topic_gate.allows(text)
+        tp += predicted and actual == label
+        fp += predicted and actual != label
+        fn += not predicted and actual == label
+
+    min_precision, min_recall = FLOORS[label, with_classifier]
+    assert tp / (tp + fp) >= min_precision
+    assert tp / (tp + fn) >= min_recall
+
+
+@pytest.mark.parametrize("text", [
+    "Kapan mangga sudah masak di pohon?",
+    "Apakah perlu sertifikat benih?",
+    "Bagaimana program pemupukan berimbang untuk padi?",
+    "Apakah bisa pakai kredit usaha rakyat untuk beli bibit?",
+    "Di mana bank benih terdekat?",
+    "Berapa gaji buruh tanam per hari?",
+    "Di provinsi mana paling cocok?",
+    "Berapa harga di provinsi ini?",
+    "Bagaimana cara menjualnya lewat internet?",
+    "Apakah bisa dijual ke luar negeri secara legal?",
+])
+def test_farm_terms_win_over_blocked(text):
+    assert gate.create_farm_gate().allows(text)
+
+
+@pytest.mark.parametrize("text", [
+    "Bagaimana cara membuat website sendiri?",
+    "Apa isi pasal 362 KUHP?",
+])
+def test_farm_gate_blocks_off_topic(text):
+    assert not gate.create_farm_gate().allows(text)
+
+
+def test_farm_classifier_scores_question_with_plant(classifier):
+    farm_gate = gate.create_farm_gate(classifier)
+
+    assert farm_gate.allows("Bagaimana cara menjualnya lewat internet?", context="padi")
+    # Leksikon terlarang tetap dinilai dari pertanyaannya saja
+    assert not farm_gate.allows("Bagaimana cara membuat website sendiri?", context="padi")
@@ -0,0 +1,54 @@
+import pytest
+
+import ingest_laws
+import legal_index
+
+KUHP = """Nama: Kitab Undang-Undang Hukum Pidana
+Alias: kuhp, bw
+
+Pasal 362
+Barang siapa mengambil barang sesuatu yang seluruhnya atau sebagian kepunyaan orang lain,
+dengan maksud untuk dimiliki secara melawan hukum, diancam karena pencurian.
+"""
+
+KUHPERDATA = """Nama: Kitab Undang-Undang Hukum Perdata
+Alias: kuhperdata, {alias}
+
+Pasal 1320
+Supaya terjadi persetujuan yang sah, perlu dipenuhi empat syarat.
+"""
+
+
+def write_laws(folder, shared_alias: str):
+    (folder / "kuhp.txt").write_text(KUHP, encoding="utf-8")
+    (folder / "kuhperdata.txt").write_text(KUHPERDATA.format(alias=shared_alias), encoding="utf-8")
+
+
+@pytest.fixture
+def index(tmp_path):
+    write_laws(tmp_path, "burgerlijk wetboek")
+    ingest_laws.build_index(str(tmp_path), str(tmp_path / "index"))
+    index = legal_index.load_index(str(tmp_path / "index"))
+    yield index
+    index.close()
+
+
+@pytest.mark.parametrize(("query", "expected"), [
+    ("Apa isi pasal 362 KUHP?", ("kuhp", "362")),
+    ("kuhp pasal 362 itu tentang apa?", ("kuhp", "362")),
+    ("pasal 1320 ayat (1) kuhperdata", ("kuhperdata", "1320")),
+    ("Burgerlijk Wetboek pasal 1320", ("kuhperdata", "1320")),
+    ("Bagaimana hukum pencurian?", None),
+])
+def test_find_reference(index, query, expected):
+    assert index.find_reference(query) == expected
+
+
+def test_search_ranks_matching_article(index):
+    assert index.search("hukuman mengambil barang orang lain", k=1)[0]["article"] == "362"
+
+
+def test_duplicate_alias_rejected(tmp_path):
+    write_laws(tmp_path, "bw")
+    with pytest.raises(SystemExit, match="'bw'"):
+        ingest_laws.build_index(str(tmp_path), str(tmp_path / "index"))
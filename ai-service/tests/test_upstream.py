@@ -0,0 +1,164 @@
+import asyncio
+import time
+
+import pytest
+from fastapi import HTTPException
+
+import config
+import upstream
+from scheduler import Priority
+
+PRIMARY, FALLBACK = config.AI_MODEL, config.AI_FALLBACK_MODEL
+MESSAGES = [{"role": "user", "content": "Bagaimana cara menanam padi?"}]
+
+
+async def rejected(coro) -> int:
+    with pytest.raises(HTTPException) as info:
+        await coro
+    return info.value.status_code
+
+
+def test_create_completion(fake):
+    completion = asyncio.run(upstream.create_completion(MESSAGES, max_tokens=16))
+
+    assert completion.choices[0].message.content
+    assert completion.usage.completion_tokens == 16
+    assert fake.scheduler.active == 0
+
+
+def test_open_stream(fake):
+    async def run():
+        stream = await upstream.open_stream(MESSAGES, max_tokens=16)
+        try:
+            parts = [part async for part in stream]
+        finally:
+            await stream.aclose()
+        return stream, parts
+
+    stream, parts = asyncio.run(run())
+
+    assert parts and stream.text == "".join(parts)
+    assert stream.usage["completion_tokens"] == 16
+    assert fake.scheduler.active == 0
+
+
+def test_rate_limit_retried_after_retry_after(fake):
+    fake.use_scheduler(fallbacks={})
+    fake.fail(fail_first=1, retry_after=0.3)
+
+    async def run():
+        start = time.perf_counter()
+        completion = await upstream.create_completion(MESSAGES, max_tokens=16)
+        return completion, time.perf_counter() - start, await fake.stats()
+
+    completion, elapsed, stats = asyncio.run(run())
+
+    assert completion.model == PRIMARY
+    # retry-after memblokir bucket model, jadi retry tidak dikirim lebih cepat
+    assert elapsed >= 0.3
+    assert stats["requests"] == 2 and stats["rate_limited"] == 1
+    assert fake.scheduler.stats["retries"] == 1
+
+
+def test_rate_limit_exhausts_retries(fake):
+    fake.use_scheduler(fallbacks={}, max_retries=1)
+    fake.fail(rate_limit_rate=1.0, retry_after=0.05)
+
+    status = asyncio.run(rejected(upstream.create_completion(MESSAGES)))
+
+    assert status == 429
+    assert fake.scheduler.active == 0
+
+
+def test_fallback_when_primary_blocked(fake):
+    fake.fail([PRIMARY], fail_first=1, retry_after=30)
+
+    async def run():
+        start = time.perf_counter()
+        completion = await upstream.create_completion(MESSAGES, max_tokens=16)
+        return completion, time.perf_counter() - start
+
+    completion, elapsed = asyncio.run(run())
+
+    # Model utama diblokir 30 detik, melebihi fallback_wait: dialihkan tanpa menunggu
+    assert completion.model == FALLBACK
+    assert elapsed < 5
+    assert fake.scheduler.stats["fallbacks"] == 1
+
+
+def test_breaker_opens_and_closes(fake):
+    fake.use_scheduler(max_retries=0, breaker_threshold=2)
+    fake.fail([PRIMARY], rate_limit_rate=1.0, retry_after=0.01)
+
+    async def run():
+        assert await rejected(upstream.create_completion(MESSAGES)) == 429
+        assert await rejected(upstream.create_completion(MESSAGES)) == 429
+        assert fake.breaker() == "open"
+        assert (await upstream.create_completion(MESSAGES)).model == FALLBACK
+
+        fake.settings.rate_limit_rate = 0.0
+        await asyncio.sleep(0.25)
+        # Setelah cooldown, satu percobaan half-open ke model utama menutup breaker
+        assert (await upstream.create_completion(MESSAGES)).model == PRIMARY
+        assert fake.breaker() == "closed"
+
+    asyncio.run(run())
+
+
+def test_failed_probe_reopens_breaker(fake):
+    fake.use_scheduler(max_retries=0, breaker_threshold=1)
+    fake.fail([PRIMARY], rate_limit_rate=1.0, retry_after=0.01)
+
+    async def run():
+        assert await rejected(upstream.create_completion(MESSAGES)) == 429
+        await asyncio.sleep(0.25)
+        assert await rejected(upstream.create_completion(MESSAGES)) == 429
+        assert fake.breaker() == "open"
+        assert (await upstream.create_completion(MESSAGES)).model == FALLBACK
+
+    asyncio.run(run())
+
+
+def test_probe_returned_when_queue_full(fake):
+    fake.use_scheduler(max_retries=0, breaker_threshold=1, max_concurrency=1, max_queue=0)
+    fake.fail([PRIMARY], rate_limit_rate=1.0, retry_after=0.01)
+
+    async def run():
+        assert await rejected(upstream.create_completion(MESSAGES)) == 429
+        fake.settings.rate_limit_rate = 0.0
+
+        # Stream ke model cadangan memegang satu-satunya slot
+        holder = await upstream.open_stream(MESSAGES)
+        assert holder.model == FALLBACK
+        await asyncio.sleep(0.25)
+        assert await rejected(upstream.create_completion(MESSAGES)) == 503
+        assert fake.breaker() == "open"
+
+        await holder.aclose()
+        assert (await upstream.create_completion(MESSAGES)).model == PRIMARY
+        assert fake.breaker() == "closed"
+
+    asyncio.run(run())
+
+
+def test_interactive_served_before_batch(fake):
+    fake.use_scheduler(max_concurrency=1)
+    order = []
+
+    async def request(label: str, priority: Priority):
+        await upstream.create_completion(MESSAGES, priority=priority)
+        order.append(label)
+
+    async def run():
+        holder = await upstream.open_stream(MESSAGES)
+        tasks = [asyncio.create_task(request("batch", Priority.BATCH))]
+        await asyncio.sleep(0.01)
+        tasks.append(asyncio.create_task(request("interactive", Priority.INTERACTIVE)))
+        await asyncio.sleep(0.01)
+        assert fake.scheduler.queued == 2
+        await holder.aclose()
+        await asyncio.gather(*tasks)
+
+    asyncio.run(run())
+
+    assert order == ["interactive", "batch"]
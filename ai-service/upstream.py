@@ -0,0 +1,240 @@
+import time
+
+import httpx
+import groq
+from fastapi import HTTPException
+from groq import AsyncGroq
+
+import config
+import metrics
+from compaction import estimate_tokens
+from scheduler import Busy, Failure, Priority, Scheduler
+
+### ==== Klien bersama ====
+
+# Satu pool koneksi keep-alive untuk seluruh proses, bukan satu koneksi per request
+http_client = httpx.AsyncClient(
+    limits=httpx.Limits(
+        max_connections=config.UPSTREAM_MAX_CONNECTIONS,
+        max_keepalive_connections=config.UPSTREAM_MAX_KEEPALIVE,
+        keepalive_expiry=config.UPSTREAM_KEEPALIVE_EXPIRY,
+    ),
+    timeout=httpx.Timeout(config.UPSTREAM_TIMEOUT, connect=config.UPSTREAM_CONNECT_TIMEOUT),
+)
+
+# Retry ditangani scheduler, bukan SDK
+groq_client = AsyncGroq(
+    api_key=config.GROQ_API_KEY,
+    base_url=config.GROQ_BASE_URL,
+    http_client=http_client,
+    max_retries=0,
+)
+
+REQUEST_TIMEOUT = httpx.Timeout(config.UPSTREAM_TIMEOUT, connect=config.UPSTREAM_CONNECT_TIMEOUT)
+
+### ==== Scheduler ====
+
+def classify_error(e: Exception) -> Failure | None:
+    """Kegagalan sementara yang layak dicoba ulang atau dialihkan ke model cadangan."""
+    if isinstance(e, (groq.RateLimitError, groq.InternalServerError)):
+        return Failure(retry_after=_retry_after(e.response.headers), headers=e.response.headers)
+    if isinstance(e, groq.APIConnectionError):  # termasuk APITimeoutError
+        return Failure()
+    return None
+
+
+def _retry_after(headers) -> float | None:
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+def create_scheduler(**overrides) -> Scheduler:
+    """Scheduler dari config; ``overrides`` mengganti argumen tertentu (mis. di test)."""
+    options = dict(
+        max_concurrency=config.MAX_CONCURRENT_REQUESTS,
+        max_queue=config.QUEUE_MAX,
+        queue_timeouts={
+            Priority.INTERACTIVE: config.QUEUE_TIMEOUT,
+            Priority.BATCH: config.BATCH_QUEUE_TIMEOUT,
+            Priority.BACKGROUND: config.BATCH_QUEUE_TIMEOUT,
+        },
+        limits={
+            config.AI_MODEL: (config.AI_RPM, config.AI_TPM),
+            **({config.AI_FALLBACK_MODEL: (config.AI_FALLBACK_RPM, config.AI_FALLBACK_TPM)} if config.AI_FALLBACK_MODEL else {}),
+        },
+        fallbacks={config.AI_MODEL: config.AI_FALLBACK_MODEL} if config.AI_FALLBACK_MODEL else {},
+        classify=classify_error,
+        max_retries=config.UPSTREAM_MAX_RETRIES,
+        backoff_base=config.RETRY_BASE_DELAY,
+        backoff_max=config.RETRY_MAX_DELAY,
+        fallback_wait=config.FALLBACK_WAIT,
+        breaker_threshold=config.BREAKER_FAILURES,
+        breaker_cooldown=config.BREAKER_COOLDOWN,
+    )
+    options.update(overrides)
+    return Scheduler(**options)
+
+
+scheduler = create_scheduler()
+
+
+def estimate_request_tokens(messages: list[dict], max_tokens: int) -> int:
+    # Dicadangkan saat antre, dikoreksi dengan usage aktual setelah selesai
+    return sum(estimate_tokens(m["content"]) + 4 for m in messages) + max_tokens
+
+
+async def _schedule(call, model: str, priority: Priority, est_tokens: int):
+    try:
+        return await scheduler.run(call, model=model, priority=priority, est_tokens=est_tokens)
+    except Busy:
+        metrics.ERRORS.labels("busy").inc()
+        raise HTTPException(
+            status_code=503,
+            detail="Layanan AI sedang sibuk. Silakan coba lagi beberapa saat lagi.",
+            headers={"Retry-After": "1"},
+        )
+    except groq.RateLimitError as e:
+        metrics.ERRORS.labels("rate_limited").inc()
+        retry_after = _retry_after(e.response.headers)
+        raise HTTPException(
+            status_code=429,
+            detail="Layanan AI sedang mencapai batas pemakaian. Silakan coba lagi nanti.",
+            headers={"Retry-After": str(int(retry_after or 5))},
+        )
+    except groq.APITimeoutError:
+        metrics.ERRORS.labels("timeout").inc()
+        raise HTTPException(status_code=504, detail="Layanan AI tidak merespons tepat waktu.")
+
+
+async def create_completion(
+    messages: list[dict],
+    max_tokens: int = 1024,
+    model: str | None = None,
+    priority: Priority = Priority.INTERACTIVE,
+):
+    """Completion biasa; ``completion.model`` berisi model yang benar-benar menjawab."""
+
+    async def call(chosen: str):
+        start = time.perf_counter()
+        raw = await groq_client.chat.completions.with_raw_response.create(
+            messages=messages,
+            model=chosen,
+            temperature=0.7,
+            max_tokens=max_tokens,
+            top_p=1,
+            timeout=REQUEST_TIMEOUT,
+        )
+        completion = await raw.parse()
+        metrics.UPSTREAM_LATENCY.labels(chosen, "false").observe(time.perf_counter() - start)
+        return completion, raw.headers
+
+    lease = await _schedule(
+        call, model or config.AI_MODEL, priority, estimate_request_tokens(messages, max_tokens)
+    )
+    completion = lease.result
+    usage = completion.usage.model_dump() if completion.usage else None
+    metrics.record_usage(lease.model, usage)
+    lease.release(usage["total_tokens"] if usage else None)
+    return completion
+
+
+async def open_stream(
+    messages: list[dict],
+    max_tokens: int = 1024,
+    priority: Priority = Priority.INTERACTIVE,
+) -> "CompletionStream":
+    """Mulai completion dengan stream=True.
+
+    Slot scheduler dipegang sampai stream selesai atau ditutup, sehingga
+    503 tetap dikirim sebelum response streaming dimulai. Retry dan
+    pengalihan model hanya terjadi sebelum token pertama.
+    """
+
+    started = 0.0
+
+    async def call(chosen: str):
+        nonlocal started
+        started = time.perf_counter()
+        raw = await groq_client.chat.completions.with_raw_response.create(
+            messages=messages,
+            model=chosen,
+            temperature=0.7,
+            max_tokens=max_tokens,
+            top_p=1,
+            stream=True,
+            timeout=REQUEST_TIMEOUT,
+        )
+        return await raw.parse(), raw.headers
+
+    lease = await _schedule(call, config.AI_MODEL, priority, estimate_request_tokens(messages, max_tokens))
+    return CompletionStream(lease, started)
+
+
+class CompletionStream:
+    """Iterator async atas potongan teks dari satu completion streaming.
+
+    Setelah iterasi selesai, ``text`` berisi jawaban lengkap dan ``usage``
+    berisi jumlah token (bila dikirim upstream). ``aclose()`` memutus koneksi
+    upstream sehingga generasi yang ditinggalkan klien ikut berhenti.
+    """
+
+    def __init__(self, lease, started: float):
+        self._stream = lease.result
+        self._lease = lease
+        self._started = started
+        self._first_token = False
+        self._closed = False
+        self._parts: list[str] = []
+        self.model = lease.model
+        self.usage: dict | None = None
+
+    @property
+    def text(self) -> str:
+        return "".join(self._parts)
+
+    async def __aiter__(self):
+        async for chunk in self._stream:
+            usage = _chunk_usage(chunk)
+            if usage is not None:
+                self.usage = usage
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if delta:
+                if not self._first_token:
+                    self._first_token = True
+                    metrics.UPSTREAM_TTFT.labels(self.model).observe(time.perf_counter() - self._started)
+                self._parts.append(delta)
+                yield delta
+
+    async def aclose(self):
+        if self._closed:
+            return
+        self._closed = True
+        metrics.UPSTREAM_LATENCY.labels(self.model, "true").observe(time.perf_counter() - self._started)
+        metrics.record_usage(self.model, self.usage)
+        try:
+            await self._stream.close()
+        finally:
+            self._lease.release(self.usage["total_tokens"] if self.usage else None)
+
+
+def _chunk_usage(chunk) -> dict | None:
+    # Groq mengirim usage di x_groq pada chunk terakhir; API gaya OpenAI memakai chunk.usage
+    usage = getattr(chunk, "usage", None)
+    if usage is None:
+        x_groq = getattr(chunk, "x_groq", None)
+        usage = getattr(x_groq, "usage", None) if x_groq is not None else None
+    if usage is None:
+        return None
+    return {
+        "prompt_tokens": usage.prompt_tokens,
+        "completion_tokens": usage.completion_tokens,
+        "total_tokens": usage.total_tokens,
+    }
+
+
+async def close():
+    await http_client.aclose()